@@ -1,38 +1,372 @@
 
-from fastapi import APIRouter, Depends
+import asyncio
+from datetime import date
+from itertools import islice
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Response, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models import Absence
 from .. import schemas
-from ..database import SessionLocal
+from ..core.responses import FastJSONResponse
 from ..core.security import get_current_user
+from ..services import absence_export, absence_import, archive, coverage, rollups, workdays
+from ..services.absence_writes import AbsenceOverlapError, AbsenceReferenceError, add_absence
+from ..services.calendar import calendar_cache, month_range
+from ..services.write_batcher import ABSENCE_WRITE_BATCH, absence_batcher
+from ..tenancy import (
+    current_team, get_async_team_db, get_async_team_read_db, get_current_team,
+    get_team_db, get_team_read_db, team_session,
+)
 
 router = APIRouter()
+async_router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+def encode_cursor(absence_date: date, absence_id: int) -> str:
+    """Build an opaque keyset cursor from the last row of a page."""
+    return f"{absence_date.isoformat()}:{absence_id}"
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    """Parse a cursor produced by encode_cursor, raising 400 if malformed."""
     try:
-        yield db
-    finally:
-        db.close()
+        raw_date, raw_id = cursor.split(":", 1)
+        return date.fromisoformat(raw_date), int(raw_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def filter_absences(
+    query,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    person_id: Optional[int] = None,
+    type_id: Optional[int] = None,
+    model=Absence,
+):
+    """Apply the shared absence filters (inclusive date range, person, type)."""
+    if start_date is not None:
+        query = query.filter(model.date >= start_date)
+    if end_date is not None:
+        query = query.filter(model.date <= end_date)
+    if person_id is not None:
+        query = query.filter(model.person_id == person_id)
+    if type_id is not None:
+        query = query.filter(model.type_id == type_id)
+    return query
+
+def page_absences(query, skip: int, limit: int, cursor: Optional[str], model=Absence):
+    """Order by (date, id) and apply the cursor (or legacy skip) and limit."""
+    if cursor:
+        query = query.filter(tuple_(model.date, model.id) > decode_cursor(cursor))
+    query = query.order_by(model.date, model.id)
+    if skip and not cursor:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+def page_statements(models: list, expand: set[str], filters: tuple, skip: int, limit: int, cursor: Optional[str]):
+    """
+    One page statement per absence table in `models`, their column names,
+    and the rows to skip once they are merged: across several tables each
+    returns its first skip + limit rows and the offset applies to the merge.
+    """
+    merged_skip = 0
+    if len(models) > 1 and not cursor:
+        skip, limit, merged_skip = 0, skip + limit, skip
+    statements = []
+    for model in models:
+        query, keys = absence_export.absence_columns(expand, model)
+        query = filter_absences(query, *filters, model=model)
+        statements.append(page_absences(query, skip, limit, cursor, model))
+    return statements, keys, merged_skip
+
+def merge_pages(pages: list[list], skip: int, limit: int) -> list:
+    """Combine the pages of page_statements() in (date, id) order."""
+    return list(islice(archive.merge_ordered(pages), skip, skip + limit))
+
+def set_next_cursor(response: Response, absences: list, limit: int):
+    """Expose the cursor of the next page when this one is full."""
+    if len(absences) == limit:
+        last = absences[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last.date, last.id)
+
+OverlapPolicy = Literal["reject", "flag", "allow"]
+
+EXPANDABLE = {"person", "type"}
+
+def parse_expand(expand: Optional[str]) -> set[str]:
+    """Parse a comma-separated `expand` value, rejecting unknown relations."""
+    fields = {field.strip() for field in (expand or "").split(",") if field.strip()}
+    unknown = fields - EXPANDABLE
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Cannot expand: {', '.join(sorted(unknown))}")
+    return fields
+
+def absence_page_response(rows: list, keys: list[str], limit: int) -> FastJSONResponse:
+    """
+    Encode a page of column rows directly with orjson; the route's
+    response_model only documents the shape and is not re-validated.
+    """
+    response = FastJSONResponse(absence_export.absence_records(rows, keys))
+    set_next_cursor(response, rows, limit)
+    return response
+
+def overlap_conflict(error: AbsenceOverlapError) -> HTTPException:
+    return HTTPException(
+        status_code=409,
+        detail={"message": str(error), "conflicts": error.conflicts},
+    )
 
-@router.get("/absences", response_model=list[schemas.Absence])
+def set_conflicts_header(response: Response, conflicts: list[int]):
+    if conflicts:
+        response.headers["X-Absence-Conflicts"] = ",".join(str(i) for i in conflicts)
+
+@router.get("/absences", response_model=list[schemas.AbsenceExpanded], response_model_exclude_none=True)
 def read_absences(
-    skip: int = 0, 
-    limit: int = 100, 
-    db: Session = Depends(get_db),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    person_id: Optional[int] = None,
+    type_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    expand: Optional[str] = None,
+    db: Session = Depends(get_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    List absences ordered by (date, id).
+
+    Pass the X-Next-Cursor header of a page back as `cursor` to fetch the
+    next one; keyset pagination stays constant-cost on deep pages, unlike
+    `skip`, which is kept for backwards compatibility. `expand=person,type`
+    embeds the related person and type in each absence. Archived absences
+    are included when the range reaches back to them.
+    """
+    expand_fields = parse_expand(expand)
+    statements, keys, merged_skip = page_statements(
+        archive.absence_tables(db, start_date), expand_fields,
+        (start_date, end_date, person_id, type_id), skip, limit, cursor,
+    )
+    rows = merge_pages([db.execute(statement).all() for statement in statements], merged_skip, limit)
+    return absence_page_response(rows, keys, limit)
+
+@router.get("/absences/export")
+def export_absences(
+    format: Literal["csv", "ndjson"] = "csv",
+    include_names: bool = False,
+    expand: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    person_id: Optional[int] = None,
+    type_id: Optional[int] = None,
+    team: str = Depends(get_current_team),
     current_user: str = Depends(get_current_user)
 ):
-    absences = db.query(Absence).offset(skip).limit(limit).all()
-    return absences
+    """
+    Stream every matching absence as CSV or NDJSON, ordered by (date, id).
+    `expand=person,type` adds person_name/type_name columns
+    (include_names=true is shorthand for both).
+    The stream owns its session so it stays open until the last row is sent.
+    """
+    fields = EXPANDABLE if include_names else parse_expand(expand)
+
+    def generate():
+        db = team_session(team, read=True)
+        try:
+            streams = []
+            for model in archive.absence_tables(db, start_date):
+                query, keys = absence_export.absence_columns(fields, model)
+                query = filter_absences(
+                    query, start_date, end_date, person_id, type_id, model,
+                ).order_by(model.date, model.id)
+                streams.append(db.execute(query, execution_options={"yield_per": absence_export.BATCH_SIZE}))
+            rows = archive.merge_ordered(streams)
+            encode = absence_export.iter_ndjson if format == "ndjson" else absence_export.iter_csv
+            yield from encode(rows, keys)
+        finally:
+            db.close()
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="absences.{format}"'},
+    )
+
+@router.get("/absences/calendar", response_model=schemas.AbsenceCalendar)
+def read_absence_calendar(
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    db: Session = Depends(get_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Person x day matrix for a month (YYYY-MM) or an explicit date range.
+    Each cell is type_id * 4 + duration code (1 first half, 2 second half,
+    3 full day); 0 means present.
+    """
+    if month:
+        try:
+            start_date, end_date = month_range(month)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid month")
+    if start_date is None or end_date is None:
+        raise HTTPException(status_code=400, detail="Provide month or start_date and end_date")
+    if end_date < start_date or (end_date - start_date).days > 366:
+        raise HTTPException(status_code=400, detail="Date range must be between 1 and 367 days")
+    body = calendar_cache.get(db, start_date, end_date)
+    return Response(content=body, media_type="application/json")
+
+@router.get("/absences/coverage", response_model=schemas.AbsenceCoverage)
+def read_absence_coverage(
+    start_date: date,
+    end_date: date,
+    include_people: bool = False,
+    db: Session = Depends(get_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """How many people are off on each day between two dates, and optionally who."""
+    if end_date < start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    return coverage.summarize(db, start_date, end_date, include_people)
+
+@router.get("/absences/summary", response_model=list[schemas.AbsenceSummary])
+def read_absence_summary(
+    period: Literal["month", "year"] = "month",
+    year: Optional[int] = None,
+    person_id: Optional[int] = None,
+    type_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    working_days: bool = False,
+    db: Session = Depends(get_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Absence counts and days per person, type and month or year. With
+    start_date/end_date the totals cover just that range instead of a year.
+    With working_days=true each row also counts the days off that fell on
+    working days (not weekends or holidays).
+    """
+    if start_date is not None or end_date is not None:
+        if start_date is None or end_date is None or start_date > end_date:
+            raise HTTPException(status_code=400, detail="Give both start_date and end_date, in order")
+        if not working_days:
+            return rollups.summarize_range(db, start_date, end_date, period, person_id, type_id)
+    elif working_days:
+        if year is not None:
+            start_date, end_date = date(year, 1, 1), date(year, 12, 31)
+        else:
+            start_date, end_date = workdays.absence_bounds(db, person_id, type_id)
+            if start_date is None:
+                return []
+    else:
+        return rollups.summarize(db, period, year, person_id, type_id)
+    try:
+        return workdays.summarize_working(db, start_date, end_date, period, person_id, type_id)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
 
 @router.post("/absences", response_model=schemas.Absence)
 def create_absence(
     absence: schemas.AbsenceCreate, 
-    db: Session = Depends(get_db),
+    response: Response,
+    overlap: Optional[OverlapPolicy] = None,
+    db: Session = Depends(get_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Create an absence. Overlaps with the person's existing absences on the
+    same date are rejected with 409, or with overlap=flag reported in the
+    X-Absence-Conflicts header.
+    """
+    data, policy = absence.model_dump(), overlap or coverage.ABSENCE_OVERLAP_POLICY
+    try:
+        if ABSENCE_WRITE_BATCH:
+            db_absence, conflicts = absence_batcher.submit(data, policy, current_team(db)).result()
+        else:
+            db_absence, conflicts = add_absence(db, data, policy)
+    except AbsenceOverlapError as e:
+        raise overlap_conflict(e)
+    except AbsenceReferenceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ABSENCE_WRITE_BATCH:
+        db.commit()
+        calendar_cache.invalidate()
+        db.refresh(db_absence)
+    set_conflicts_header(response, conflicts)
+    return db_absence
+
+@router.post("/absences/import", response_model=schemas.AbsenceImportResult)
+def import_absences(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    overlap: Optional[OverlapPolicy] = None,
+    db: Session = Depends(get_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Bulk-load absences from a CSV (with header) or NDJSON upload.
+
+    Rows may reference people and types by `person`/`type` name instead of
+    id. Invalid rows are reported in `errors` and skipped.
+    """
+    if format is None:
+        filename = (file.filename or "").lower()
+        is_ndjson = filename.endswith((".ndjson", ".jsonl")) or "ndjson" in (file.content_type or "")
+        format = "ndjson" if is_ndjson else "csv"
+    reader = absence_import.iter_ndjson if format == "ndjson" else absence_import.iter_csv
+    return absence_import.import_absences(
+        db, reader(file.file), overlap=overlap or coverage.ABSENCE_OVERLAP_POLICY
+    )
+
+
+# Async variants, mounted ahead of `router` when ASYNC_DB is enabled
+
+@async_router.get("/absences", response_model=list[schemas.AbsenceExpanded], response_model_exclude_none=True)
+async def read_absences_async(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    person_id: Optional[int] = None,
+    type_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    expand: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    expand_fields = parse_expand(expand)
+    statements, keys, merged_skip = page_statements(
+        await db.run_sync(archive.absence_tables, start_date), expand_fields,
+        (start_date, end_date, person_id, type_id), skip, limit, cursor,
+    )
+    pages = [(await db.execute(statement)).all() for statement in statements]
+    return absence_page_response(merge_pages(pages, merged_skip, limit), keys, limit)
+
+@async_router.post("/absences", response_model=schemas.Absence)
+async def create_absence_async(
+    absence: schemas.AbsenceCreate, 
+    response: Response,
+    overlap: Optional[OverlapPolicy] = None,
+    db: AsyncSession = Depends(get_async_team_db),
     current_user: str = Depends(get_current_user)
 ):
-    db_absence = Absence(**absence.model_dump())
-    db.add(db_absence)
-    db.commit()
-    db.refresh(db_absence)
+    data, policy = absence.model_dump(), overlap or coverage.ABSENCE_OVERLAP_POLICY
+    try:
+        if ABSENCE_WRITE_BATCH:
+            db_absence, conflicts = await asyncio.wrap_future(absence_batcher.submit(data, policy, current_team(db)))
+        else:
+            db_absence, conflicts = await db.run_sync(add_absence, data, policy)
+    except AbsenceOverlapError as e:
+        raise overlap_conflict(e)
+    except AbsenceReferenceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not ABSENCE_WRITE_BATCH:
+        await db.commit()
+        calendar_cache.invalidate()
+        await db.refresh(db_absence)
+    set_conflicts_header(response, conflicts)
     return db_absence
@@ -1,29 +1,26 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-import pyotp, qrcode, io, base64
+import asyncio, orjson, pyotp
 from datetime import timedelta
+from typing import Literal
 from ..models import User
 from .. import schemas
-from ..database import SessionLocal, engine, Base
+from ..database import DEFAULT_TEAM, get_db
 from ..core.security import (
     encrypt_username_with_password, 
     verify_password, 
     change_password,
     create_access_token,
+    get_current_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-
-Base.metadata.create_all(bind=engine)
+from ..services import provisioning
+from ..tenancy import get_current_team
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 @router.post("/register", response_model=schemas.RegisterResponse)
 def register(data: schemas.UserCreate, db: Session = Depends(get_db)):
     db_user = db.query(User).filter(User.username == data.username).first()
@@ -34,18 +31,51 @@ def register(data: schemas.UserCreate, db: Session = Depends(get_db)):
     encrypted_password = encrypt_username_with_password(data.username, data.password)
     
     secret = pyotp.random_base32()
-    user = User(username=data.username, password=encrypted_password, otp_secret=secret)
+    # Self-registered users join DEFAULT_TEAM; other teams are assigned through /auth/provision
+    user = User(username=data.username, password=encrypted_password, otp_secret=secret, team=DEFAULT_TEAM)
     db.add(user)
     db.commit()
     db.refresh(user)
 
-    otp_uri = pyotp.totp.TOTP(secret).provisioning_uri(name=data.username, issuer_name="TeamTracker")
-    qr = qrcode.make(otp_uri)
-    buffer = io.BytesIO()
-    qr.save(buffer, format="PNG")
-    img_b64 = base64.b64encode(buffer.getvalue()).decode()
+    otp_uri = provisioning.otp_uri(data.username, secret)
+    img_b64 = provisioning.render_qr(otp_uri, "png")
     return {"qr": img_b64, "secret": secret, "username": user.username, "id": user.id}
 
+@router.post("/provision", response_model=schemas.ProvisionResult)
+async def provision_users(
+    batch: schemas.ProvisionRequest,
+    format: Literal["json", "ndjson"] = "json",
+    db: Session = Depends(get_db),
+    team: str = Depends(get_current_team),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Create a batch of users in the caller's team in one transaction and
+    return their enrollment bundle (TOTP secret, otpauth:// URI, QR code and
+    any generated password). QR codes are rendered in a process pool;
+    format=ndjson streams users as their codes are ready.
+    """
+    users = [user.model_dump() for user in batch.users]
+    try:
+        entries = await run_in_threadpool(provisioning.create_users, db, users, team)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    chunks = provisioning.qr_renderer.submit(entries, batch.qr)
+
+    if format == "ndjson":
+        async def generate():
+            for chunk in chunks:
+                rendered = await asyncio.wrap_future(chunk)
+                yield b"".join(orjson.dumps(entry) + b"\n" for entry in rendered)
+
+        return StreamingResponse(
+            generate(),
+            media_type="application/x-ndjson",
+            headers={"Content-Disposition": 'attachment; filename="enrollment.ndjson"'},
+        )
+    rendered = await asyncio.gather(*(asyncio.wrap_future(chunk) for chunk in chunks))
+    return {"users": [entry for chunk in rendered for entry in chunk]}
+
 @router.post("/login")
 def login(data: schemas.TokenData, db: Session = Depends(get_db)):
     user = db.query(User).filter(User.username == data.username).first()
@@ -63,7 +93,7 @@ def login(data: schemas.TokenData, db: Session = Depends(get_db)):
     
     # Create JWT access token
     access_token = create_access_token(
-        data={"sub": user.username},
+        data={"sub": user.username, "team": user.team or DEFAULT_TEAM},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
     
@@ -0,0 +1,108 @@
+import asyncio
+import json
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+from .. import schemas
+from ..core.security import get_current_user
+from ..services import changes
+from ..tenancy import get_current_team, get_team_read_db, team_session
+
+router = APIRouter()
+
+# Comment line sent when a stream has been idle this long, to keep proxies from closing it
+KEEPALIVE_SECONDS = 15.0
+
+@router.get("/changes", response_model=schemas.ChangeSet)
+def read_changes(
+    since: Optional[int] = None,
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Absences, people and types changed after the `since` cursor, with the
+    ids deleted since then. Without `since`, returns only the current
+    cursor: take it before loading the full lists, then poll from it.
+    Responds 410 when the cursor is too old and the client must reload.
+    """
+    if since is None:
+        return {
+            "cursor": changes.current_cursor(db),
+            "more": False,
+            "absences": [],
+            "people": [],
+            "types": [],
+            "deleted": {entity: [] for entity in changes.ENTITIES},
+        }
+    try:
+        return changes.changes_since(db, since, limit)
+    except changes.CursorExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+def read_cursor(team: str) -> int:
+    db = team_session(team, read=True)
+    try:
+        return changes.current_cursor(db)
+    finally:
+        db.close()
+
+def load_change_event(team: str, since: int) -> Optional[tuple[int, str]]:
+    """Next batch of the team's changes after `since` as (cursor, JSON), or None when nothing changed."""
+    db = team_session(team, read=True)
+    try:
+        result = changes.changes_since(db, since)
+        if result["cursor"] == since:
+            return None
+        return result["cursor"], schemas.ChangeSet.model_validate(result).model_dump_json()
+    finally:
+        db.close()
+
+@router.get("/changes/stream")
+async def stream_changes(
+    request: Request,
+    since: Optional[int] = None,
+    last_event_id: Optional[int] = Header(None),
+    team: str = Depends(get_current_team),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Server-sent events: one `changes` event (a ChangeSet) per batch of
+    writes after `since`, or after Last-Event-ID when reconnecting.
+    """
+    cursor = last_event_id if last_event_id is not None else since
+    if cursor is None:
+        cursor = await run_in_threadpool(read_cursor, team)
+
+    async def events():
+        nonlocal cursor
+        idle = 0.0
+        with changes.Subscription() as wake:
+            while not await request.is_disconnected():
+                # Cleared before reading so a commit in between isn't missed
+                wake.clear()
+                try:
+                    batch = await run_in_threadpool(load_change_event, team, cursor)
+                except changes.CursorExpiredError as e:
+                    yield f"event: expired\ndata: {json.dumps(str(e))}\n\n"
+                    return
+                if batch is not None:
+                    cursor, payload = batch
+                    idle = 0.0
+                    yield f"id: {cursor}\nevent: changes\ndata: {payload}\n\n"
+                    continue
+                try:
+                    await asyncio.wait_for(wake.wait(), changes.CHANGE_STREAM_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    idle += changes.CHANGE_STREAM_POLL_SECONDS
+                    if idle >= KEEPALIVE_SECONDS:
+                        idle = 0.0
+                        yield ": keepalive\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
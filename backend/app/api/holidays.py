@@ -0,0 +1,74 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..models import Holiday
+from .. import schemas
+from ..database import get_db, get_read_db
+from ..core.security import get_current_user
+from ..services.workdays import workday_cache
+
+router = APIRouter()
+
+@router.get("/holidays", response_model=list[schemas.Holiday])
+def read_holidays(
+    year: Optional[int] = None,
+    db: Session = Depends(get_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    query = db.query(Holiday)
+    if year is not None:
+        query = query.filter(Holiday.date >= date(year, 1, 1), Holiday.date <= date(year, 12, 31))
+    return query.order_by(Holiday.date).all()
+
+@router.post("/holidays", response_model=schemas.Holiday)
+def create_holiday(
+    holiday: schemas.HolidayCreate,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    db_holiday = Holiday(date=holiday.date, name=holiday.name)
+    db.add(db_holiday)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="A holiday already exists on that date")
+    workday_cache.invalidate()
+    db.refresh(db_holiday)
+    return db_holiday
+
+@router.delete("/holidays/{holiday_id}")
+def delete_holiday(
+    holiday_id: int,
+    db: Session = Depends(get_db),
+    current_user: str = Depends(get_current_user)
+):
+    db_holiday = db.get(Holiday, holiday_id)
+    if db_holiday is None:
+        raise HTTPException(status_code=404, detail="Holiday not found")
+    db.delete(db_holiday)
+    db.commit()
+    workday_cache.invalidate()
+    return {"message": "Holiday deleted successfully"}
+
+@router.get("/workdays", response_model=schemas.WorkingDays)
+def read_working_days(
+    start_date: date,
+    end_date: date,
+    current_user: str = Depends(get_current_user)
+):
+    """Working days from start_date to end_date inclusive, skipping weekends and holidays."""
+    if start_date > end_date:
+        raise HTTPException(status_code=400, detail="start_date must not be after end_date")
+    try:
+        calendar = workday_cache.get(start_date, end_date)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {
+        "start_date": start_date,
+        "end_date": end_date,
+        "calendar_days": (end_date - start_date).days + 1,
+        "working_days": calendar.working_days(start_date, end_date),
+    }
@@ -1,39 +1,70 @@
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models import People
 from .. import schemas
-from ..database import SessionLocal
 from ..core.security import get_current_user
+from ..services.calendar import calendar_cache
+from ..services import reference_writes
+from ..services.reference_cache import people_cache
+from ..services.reference_writes import AbsencePolicy
+from ..tenancy import current_team, get_async_team_db, get_async_team_read_db, get_team_db, get_team_read_db
 
 router = APIRouter()
+async_router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+def run_bulk(db: Session, write, *args, **kwargs) -> dict:
+    """Run a reference_writes function on People and commit, mapping its errors to HTTP."""
     try:
-        yield db
-    finally:
-        db.close()
+        result = write(db, People, *args, **kwargs)
+        db.commit()
+    except reference_writes.ReferenceNotFoundError as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except reference_writes.ReferenceInUseError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Names must be unique")
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    people_cache.invalidate()
+    calendar_cache.invalidate()
+    return result
 
 @router.get("/people", response_model=list[schemas.People])
 def read_people(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_team_read_db),
     current_user: str = Depends(get_current_user)
 ):
-    people = db.query(People).offset(skip).limit(limit).all()
-    return people
+    cached = people_cache.cached_response(request, current_team(db), (skip, limit))
+    if cached is not None:
+        return cached
+    version = people_cache.version
+    # Columns in schemas.People field order, encoded without ORM objects
+    people = db.query(People.name, People.id).order_by(People.id).offset(skip).limit(limit).all()
+    return people_cache.store(current_team(db), (skip, limit), people, version)
 
 @router.post("/people", response_model=schemas.People)
 def create_people(
     people: schemas.PeopleCreate, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_team_db),
     current_user: str = Depends(get_current_user)
 ):
     db_people = People(name=people.name)
     db.add(db_people)
     db.commit()
+    people_cache.invalidate()
+    calendar_cache.invalidate()
     db.refresh(db_people)
     return db_people
 
@@ -41,7 +72,7 @@ def create_people(
 def update_people(
     people_id: int, 
     people: schemas.PeopleCreate, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_team_db),
     current_user: str = Depends(get_current_user)
 ):
     db_people = db.query(People).filter(People.id == people_id).first()
@@ -49,18 +80,113 @@ def update_people(
         raise HTTPException(status_code=404, detail="Person not found")
     db_people.name = people.name
     db.commit()
+    people_cache.invalidate()
+    calendar_cache.invalidate()
     db.refresh(db_people)
     return db_people
 
 @router.delete("/people/{people_id}")
 def delete_people(
     people_id: int, 
-    db: Session = Depends(get_db),
+    absences: AbsencePolicy = "restrict",
+    reassign_to: Optional[int] = None,
+    db: Session = Depends(get_team_db),
     current_user: str = Depends(get_current_user)
 ):
-    db_people = db.query(People).filter(People.id == people_id).first()
+    """
+    Delete a person. Refused while absences reference it unless
+    absences=delete or absences=reassign&reassign_to=<id> is given.
+    """
+    if db.get(People, people_id) is None:
+        raise HTTPException(status_code=404, detail="Person not found")
+    run_bulk(db, reference_writes.delete_many, [people_id], absences, reassign_to)
+    return {"message": "Person deleted successfully"}
+
+@router.post("/people/bulk-delete", response_model=schemas.BulkResult)
+def bulk_delete_people(
+    bulk: schemas.BulkDelete,
+    db: Session = Depends(get_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    """Delete many people in one transaction with an explicit absence policy."""
+    return run_bulk(db, reference_writes.delete_many, bulk.ids, bulk.absences, bulk.reassign_to)
+
+@router.post("/people/bulk-rename", response_model=schemas.BulkResult)
+def bulk_rename_people(
+    bulk: schemas.BulkRename,
+    db: Session = Depends(get_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    """Rename many people with a single UPDATE."""
+    return run_bulk(db, reference_writes.rename_many, {item.id: item.name for item in bulk.items})
+
+@router.post("/people/merge", response_model=schemas.BulkResult)
+def merge_people(
+    bulk: schemas.Merge,
+    db: Session = Depends(get_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    """Move every absence of source_ids to target_id, then delete the sources."""
+    return run_bulk(db, reference_writes.merge, bulk.source_ids, bulk.target_id)
+
+
+# Async variants, mounted ahead of `router` when ASYNC_DB is enabled
+
+@async_router.get("/people", response_model=list[schemas.People])
+async def read_people_async(
+    request: Request,
+    skip: int = 0, 
+    limit: int = 100, 
+    db: AsyncSession = Depends(get_async_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    cached = people_cache.cached_response(request, current_team(db), (skip, limit))
+    if cached is not None:
+        return cached
+    version = people_cache.version
+    result = await db.execute(select(People.name, People.id).order_by(People.id).offset(skip).limit(limit))
+    return people_cache.store(current_team(db), (skip, limit), result.all(), version)
+
+@async_router.post("/people", response_model=schemas.People)
+async def create_people_async(
+    people: schemas.PeopleCreate, 
+    db: AsyncSession = Depends(get_async_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    db_people = People(name=people.name)
+    db.add(db_people)
+    await db.commit()
+    people_cache.invalidate()
+    calendar_cache.invalidate()
+    await db.refresh(db_people)
+    return db_people
+
+@async_router.put("/people/{people_id}", response_model=schemas.People)
+async def update_people_async(
+    people_id: int, 
+    people: schemas.PeopleCreate, 
+    db: AsyncSession = Depends(get_async_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    db_people = await db.get(People, people_id)
     if not db_people:
         raise HTTPException(status_code=404, detail="Person not found")
-    db.delete(db_people)
-    db.commit()
+    db_people.name = people.name
+    await db.commit()
+    people_cache.invalidate()
+    calendar_cache.invalidate()
+    await db.refresh(db_people)
+    return db_people
+
+@async_router.delete("/people/{people_id}")
+async def delete_people_async(
+    people_id: int, 
+    absences: AbsencePolicy = "restrict",
+    reassign_to: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    if await db.get(People, people_id) is None:
+        raise HTTPException(status_code=404, detail="Person not found")
+    await db.run_sync(run_bulk, reference_writes.delete_many, [people_id], absences, reassign_to)
     return {"message": "Person deleted successfully"}
@@ -0,0 +1,61 @@
+from fastapi import APIRouter, Depends, HTTPException, Path, Response
+from fastapi.responses import FileResponse
+from sqlalchemy.orm import Session
+from .. import schemas
+from ..core.security import get_current_user
+from ..services.report_jobs import report_jobs
+from ..services.reports import FORMATS
+from ..tenancy import get_current_team, get_team_read_db
+
+router = APIRouter()
+
+# Job ids are report_key() digests, which also name the result files
+JOB_ID = Path(..., pattern=r"^[0-9a-f]{32}$")
+
+@router.post("/reports", response_model=schemas.ReportJob, status_code=202)
+def submit_report(
+    report: schemas.ReportRequest,
+    response: Response,
+    db: Session = Depends(get_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Start building a yearly leave report (CSV or XLSX) in the background.
+    Poll GET /reports/{id} until it is done, then download it. The same
+    report over unchanged data is returned as done straight away.
+    """
+    try:
+        job = report_jobs.submit(db, report.model_dump())
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if job["status"] == "done":
+        response.status_code = 200
+    return job
+
+@router.get("/reports/{job_id}", response_model=schemas.ReportJob)
+def read_report_job(
+    job_id: str = JOB_ID,
+    team: str = Depends(get_current_team),
+    current_user: str = Depends(get_current_user)
+):
+    job = report_jobs.status(team, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return job
+
+@router.get("/reports/{job_id}/download")
+def download_report(
+    job_id: str = JOB_ID,
+    team: str = Depends(get_current_team),
+    current_user: str = Depends(get_current_user)
+):
+    job = report_jobs.status(team, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Report not found")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Report is {job['status']}")
+    found = report_jobs.cache.find(team, job_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Report has expired; submit it again")
+    path, format = found
+    return FileResponse(path, media_type=FORMATS[format], filename=f"leave-report-{job_id}.{format}")
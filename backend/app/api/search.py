@@ -0,0 +1,27 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session
+from .. import schemas
+from ..core.security import get_current_user
+from ..services import search
+from ..tenancy import get_team_read_db
+
+router = APIRouter()
+
+@router.get("/search", response_model=schemas.SearchResults)
+def search_all(
+    q: str,
+    kind: Literal["all", "people", "absences"] = "all",
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    """
+    Ranked people (by name) and absences (by reason) matching every word of
+    `q` as a prefix, e.g. q=conf or typeahead on q=ali. `skip`/`limit` page
+    each list.
+    """
+    if not search.terms(q):
+        raise HTTPException(status_code=400, detail="Search query must contain a letter or digit")
+    return search.search(db, q, kind, skip, limit)
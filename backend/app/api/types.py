@@ -1,39 +1,69 @@
 
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from ..models import Type
 from .. import schemas
-from ..database import SessionLocal
 from ..core.security import get_current_user
+from ..services import reference_writes
+from ..services.calendar import calendar_cache
+from ..services.reference_cache import types_cache
+from ..services.reference_writes import AbsencePolicy
+from ..tenancy import current_team, get_async_team_db, get_async_team_read_db, get_team_db, get_team_read_db
 
 router = APIRouter()
+async_router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
+def run_bulk(db: Session, write, *args, **kwargs) -> dict:
+    """Run a reference_writes function on Type and commit, mapping its errors to HTTP."""
     try:
-        yield db
-    finally:
-        db.close()
+        result = write(db, Type, *args, **kwargs)
+        db.commit()
+    except reference_writes.ReferenceNotFoundError as e:
+        db.rollback()
+        raise HTTPException(status_code=404, detail=str(e))
+    except reference_writes.ReferenceInUseError as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail=str(e))
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(status_code=409, detail="Names must be unique")
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(status_code=400, detail=str(e))
+    types_cache.invalidate()
+    calendar_cache.invalidate()
+    return result
 
 @router.get("/types", response_model=list[schemas.Type])
 def read_types(
+    request: Request,
     skip: int = 0, 
     limit: int = 100, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_team_read_db),
     current_user: str = Depends(get_current_user)
 ):
-    types = db.query(Type).offset(skip).limit(limit).all()
-    return types
+    cached = types_cache.cached_response(request, current_team(db), (skip, limit))
+    if cached is not None:
+        return cached
+    version = types_cache.version
+    # Columns in schemas.Type field order, encoded without ORM objects
+    types = db.query(Type.name, Type.id).order_by(Type.id).offset(skip).limit(limit).all()
+    return types_cache.store(current_team(db), (skip, limit), types, version)
 
 @router.post("/types", response_model=schemas.Type)
 def create_type(
     type: schemas.TypeCreate, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_team_db),
     current_user: str = Depends(get_current_user)
 ):
     db_type = Type(name=type.name)
     db.add(db_type)
     db.commit()
+    types_cache.invalidate()
     db.refresh(db_type)
     return db_type
 
@@ -41,7 +71,7 @@ def create_type(
 def update_type(
     type_id: int, 
     type: schemas.TypeCreate, 
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_team_db),
     current_user: str = Depends(get_current_user)
 ):
     db_type = db.query(Type).filter(Type.id == type_id).first()
@@ -49,18 +79,110 @@ def update_type(
         raise HTTPException(status_code=404, detail="Type not found")
     db_type.name = type.name
     db.commit()
+    types_cache.invalidate()
     db.refresh(db_type)
     return db_type
 
 @router.delete("/types/{type_id}")
 def delete_type(
     type_id: int, 
-    db: Session = Depends(get_db),
+    absences: AbsencePolicy = "restrict",
+    reassign_to: Optional[int] = None,
+    db: Session = Depends(get_team_db),
     current_user: str = Depends(get_current_user)
 ):
-    db_type = db.query(Type).filter(Type.id == type_id).first()
+    """
+    Delete a type. Refused while absences reference it unless
+    absences=delete or absences=reassign&reassign_to=<id> is given.
+    """
+    if db.get(Type, type_id) is None:
+        raise HTTPException(status_code=404, detail="Type not found")
+    run_bulk(db, reference_writes.delete_many, [type_id], absences, reassign_to)
+    return {"message": "Type deleted successfully"}
+
+@router.post("/types/bulk-delete", response_model=schemas.BulkResult)
+def bulk_delete_types(
+    bulk: schemas.BulkDelete,
+    db: Session = Depends(get_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    """Delete many types in one transaction with an explicit absence policy."""
+    return run_bulk(db, reference_writes.delete_many, bulk.ids, bulk.absences, bulk.reassign_to)
+
+@router.post("/types/bulk-rename", response_model=schemas.BulkResult)
+def bulk_rename_types(
+    bulk: schemas.BulkRename,
+    db: Session = Depends(get_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    """Rename many types with a single UPDATE."""
+    return run_bulk(db, reference_writes.rename_many, {item.id: item.name for item in bulk.items})
+
+@router.post("/types/merge", response_model=schemas.BulkResult)
+def merge_types(
+    bulk: schemas.Merge,
+    db: Session = Depends(get_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    """Move every absence of source_ids to target_id, then delete the sources."""
+    return run_bulk(db, reference_writes.merge, bulk.source_ids, bulk.target_id)
+
+
+# Async variants, mounted ahead of `router` when ASYNC_DB is enabled
+
+@async_router.get("/types", response_model=list[schemas.Type])
+async def read_types_async(
+    request: Request,
+    skip: int = 0, 
+    limit: int = 100, 
+    db: AsyncSession = Depends(get_async_team_read_db),
+    current_user: str = Depends(get_current_user)
+):
+    cached = types_cache.cached_response(request, current_team(db), (skip, limit))
+    if cached is not None:
+        return cached
+    version = types_cache.version
+    result = await db.execute(select(Type.name, Type.id).order_by(Type.id).offset(skip).limit(limit))
+    return types_cache.store(current_team(db), (skip, limit), result.all(), version)
+
+@async_router.post("/types", response_model=schemas.Type)
+async def create_type_async(
+    type: schemas.TypeCreate, 
+    db: AsyncSession = Depends(get_async_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    db_type = Type(name=type.name)
+    db.add(db_type)
+    await db.commit()
+    types_cache.invalidate()
+    await db.refresh(db_type)
+    return db_type
+
+@async_router.put("/types/{type_id}", response_model=schemas.Type)
+async def update_type_async(
+    type_id: int, 
+    type: schemas.TypeCreate, 
+    db: AsyncSession = Depends(get_async_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    db_type = await db.get(Type, type_id)
     if not db_type:
         raise HTTPException(status_code=404, detail="Type not found")
-    db.delete(db_type)
-    db.commit()
+    db_type.name = type.name
+    await db.commit()
+    types_cache.invalidate()
+    await db.refresh(db_type)
+    return db_type
+
+@async_router.delete("/types/{type_id}")
+async def delete_type_async(
+    type_id: int, 
+    absences: AbsencePolicy = "restrict",
+    reassign_to: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_team_db),
+    current_user: str = Depends(get_current_user)
+):
+    if await db.get(Type, type_id) is None:
+        raise HTTPException(status_code=404, detail="Type not found")
+    await db.run_sync(run_bulk, reference_writes.delete_many, [type_id], absences, reassign_to)
     return {"message": "Type deleted successfully"}
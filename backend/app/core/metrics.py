@@ -0,0 +1,239 @@
+"""
+Request and SQL instrumentation exposed in Prometheus text format.
+
+MetricsMiddleware records a latency histogram per route, plus how many SQL
+statements each request ran and how long they took. SQL timings come from
+engine event hooks (instrument_engine) and are attributed to the current
+request through a context variable, which follows sync handlers into the
+threadpool. Optional stage timers (e.g. JWT verification) split the rest.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+from sqlalchemy import event
+
+# Log statements slower than this many milliseconds (0 disables)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+logger = logging.getLogger("app.sql")
+# Shown by uvicorn's default logging config
+startup_logger = logging.getLogger("uvicorn.error")
+
+
+def process_start_time() -> float:
+    """
+    Wall-clock time the current process started. Read from /proc on Linux;
+    elsewhere falls back to when this module was imported.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22 (starttime, in clock ticks after boot); skip past "(comm)"
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/stat") as f:
+            boot_time = next(int(line.split()[1]) for line in f if line.startswith("btime"))
+        return boot_time + start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, StopIteration):
+        return time.time()
+
+
+PROCESS_STARTED = process_start_time()
+# Seconds from process start to app ready / to the first completed request
+cold_start = {"ready_seconds": None, "first_request_seconds": None}
+
+
+def mark_ready() -> None:
+    """Record that startup hooks finished; call from the app's startup."""
+    cold_start["ready_seconds"] = round(time.time() - PROCESS_STARTED, 3)
+    startup_logger.info("Worker ready %.3fs after process start", cold_start["ready_seconds"])
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of label values."""
+
+    def __init__(self, name: str, help: str, labels: tuple[str, ...], buckets: tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [bucket counts..., sum, count]
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for label_values, series in sorted(items):
+            base = ",".join(f'{k}="{v}"' for k, v in zip(self.labels, label_values))
+            sep = "," if base else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{base}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{base}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{base}}} {series[-1]}")
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "Request latency by route.",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_seconds", "Time spent in SQL per request.",
+    ("method", "route"), LATENCY_BUCKETS,
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.",
+    ("method", "route"), COUNT_BUCKETS,
+)
+QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds", "Latency of individual SQL statements.",
+    ("engine",), LATENCY_BUCKETS,
+)
+STAGE_SECONDS = Histogram(
+    "app_stage_duration_seconds", "Time spent in named request stages.",
+    ("stage",), LATENCY_BUCKETS,
+)
+
+# [query count, query seconds] for the request being handled
+_request_sql: ContextVar[Optional[list]] = ContextVar("request_sql", default=None)
+
+# Extra sources rendered on /metrics: name -> (type, help, callable returning value)
+_gauges: dict[str, tuple[str, str, Callable[[], float]]] = {}
+
+
+def register_gauge(name: str, help: str, read, kind: str = "gauge") -> None:
+    """Expose a value computed at scrape time (e.g. cache hit counters)."""
+    _gauges[name] = (kind, help, read)
+
+
+@contextmanager
+def timed(stage: str):
+    """Record the duration of a block under app_stage_duration_seconds."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - started, stage)
+
+
+def instrument_engine(sync_engine, name: str = "primary") -> None:
+    """Time every statement on an engine and attribute it to the current request."""
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        QUERY_SECONDS.observe(elapsed, name)
+        stats = _request_sql.get()
+        if stats is not None:
+            stats[0] += 1
+            stats[1] += elapsed
+        if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS:
+            logger.warning("Slow query (%.1f ms) on %s: %s", elapsed * 1000, name, statement)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _failed(context):
+        # A failed statement never reaches after_cursor_execute
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def route_template(scope) -> str:
+    """
+    Templated path of the matched route (e.g. /api/people/{people_id}).
+    Routes of included routers may only know their path relative to the
+    router prefix, so the prefix is recovered from the request path.
+    Unmatched requests are grouped so arbitrary URLs can't explode cardinality.
+    """
+    route = scope.get("route")
+    if route is None:
+        return "unmatched"
+    path = scope["path"]
+    for i, char in enumerate(path):
+        if char == "/" and route.path_regex.match(path[i:]):
+            return path[:i] + route.path
+    return route.path
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency and SQL usage."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        stats = [0, 0.0]
+        token = _request_sql.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_sql.reset(token)
+            path = route_template(scope)
+            method = scope["method"]
+            REQUEST_SECONDS.observe(elapsed, method, path, str(status["code"]))
+            REQUEST_DB_SECONDS.observe(stats[1], method, path)
+            REQUEST_DB_QUERIES.observe(stats[0], method, path)
+            if cold_start["first_request_seconds"] is None:
+                cold_start["first_request_seconds"] = round(time.time() - PROCESS_STARTED, 3)
+                startup_logger.info(
+                    "First request served %.3fs after process start",
+                    cold_start["first_request_seconds"],
+                )
+
+
+register_gauge(
+    "process_ready_seconds", "Seconds from process start until startup hooks finished.",
+    lambda: cold_start["ready_seconds"] or 0,
+)
+register_gauge(
+    "process_first_request_seconds", "Seconds from process start until the first request completed.",
+    lambda: cold_start["first_request_seconds"] or 0,
+)
+
+
+def render() -> str:
+    """All metrics in Prometheus text exposition format."""
+    lines = []
+    for histogram in (REQUEST_SECONDS, REQUEST_DB_SECONDS, REQUEST_DB_QUERIES, QUERY_SECONDS, STAGE_SECONDS):
+        lines.extend(histogram.render())
+    for name, (kind, help, read) in sorted(_gauges.items()):
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {read()}")
+    return "\n".join(lines) + "\n"
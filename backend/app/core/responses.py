@@ -0,0 +1,22 @@
+"""
+Fast JSON responses for read-heavy list endpoints.
+
+Handlers select plain column rows and return them through FastJSONResponse,
+which encodes with orjson and skips response-model validation entirely.
+The response_model on the route still documents the shape in OpenAPI.
+"""
+from typing import Any
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse encoded with orjson (dates as ISO strings)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content)
+
+
+def dump_rows(rows) -> bytes:
+    """Encode SQLAlchemy column rows as a JSON array of objects."""
+    return orjson.dumps([row._asdict() for row in rows])
@@ -6,6 +6,9 @@ This means the password is never stored, and cannot be recovered.
 import os
 import base64
 import hashlib
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from cryptography.fernet import Fernet
@@ -13,6 +16,7 @@ from jose import JWTError, jwt
 from dotenv import load_dotenv
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from . import metrics
 
 # Load environment variables
 load_dotenv()
@@ -22,6 +26,9 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production-
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Number of verified tokens kept in memory (0 disables the cache)
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+
 # Security scheme for JWT Bearer token
 security = HTTPBearer()
 
@@ -114,45 +121,148 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
-def verify_token(token: str) -> Optional[str]:
+class VerifiedTokenCache:
+    """
+    Bounded LRU cache of already-verified JWTs.
+
+    Keys are SHA-256 digests of the token so raw tokens are never held in
+    memory longer than the request. Each entry is dropped at the token's
+    own `exp`, so a cached token is never accepted past its expiry.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[bytes, tuple[tuple, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[tuple[str, Optional[str]]]:
+        """Return the cached (username, team) for a token, or None on a miss."""
+        if self.max_size <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, token: str, claims: tuple[str, Optional[str]], expires_at: float) -> None:
+        """Remember a verified token's (username, team) until `expires_at` (epoch seconds)."""
+        if self.max_size <= 0 or expires_at <= time.time():
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (claims, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Current size and hit/miss counters."""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+token_cache = VerifiedTokenCache(TOKEN_CACHE_SIZE)
+
+metrics.register_gauge(
+    "token_cache_hits_total", "Verified-token cache hits.", lambda: token_cache.hits, "counter"
+)
+metrics.register_gauge(
+    "token_cache_misses_total", "Verified-token cache misses.", lambda: token_cache.misses, "counter"
+)
+metrics.register_gauge(
+    "token_cache_size", "Tokens currently cached.", lambda: token_cache.stats()["size"]
+)
+
+
+def verify_token_claims(token: str) -> Optional[tuple[str, Optional[str]]]:
     """
     Verify and decode a JWT token.
-    
+    Tokens that verified before are answered from token_cache until they expire.
+
     Args:
         token: JWT token string
-    
+
     Returns:
-        Username from token if valid, None otherwise
+        (username, team) from the token if valid, None otherwise. The team is
+        None for tokens issued before teams existed.
     """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             return None
-        return username
+        claims = (username, payload.get("team"))
+        exp = payload.get("exp")
+        if exp is not None:
+            token_cache.put(token, claims, float(exp))
+        return claims
     except JWTError:
         return None
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> str:
+def verify_token(token: str) -> Optional[str]:
+    """Username from a valid JWT token, None otherwise."""
+    claims = verify_token_claims(token)
+    return claims[0] if claims is not None else None
+
+
+def get_token_claims(credentials: HTTPAuthorizationCredentials = Depends(security)) -> tuple[str, Optional[str]]:
     """
-    FastAPI dependency to get current authenticated user from JWT token.
-    
-    Args:
-        credentials: HTTP Authorization credentials (Bearer token)
-    
+    FastAPI dependency verifying the bearer token once per request; user and
+    team dependencies both derive from it.
+
     Returns:
-        Username from validated token
-    
+        (username, team) from the validated token
+
     Raises:
         HTTPException: If token is invalid or missing
     """
-    token = credentials.credentials
-    username = verify_token(token)
-    if username is None:
+    with metrics.timed("jwt_verify"):
+        claims = verify_token_claims(credentials.credentials)
+    if claims is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    return username
+    return claims
+
+
+def get_current_user(claims: tuple[str, Optional[str]] = Depends(get_token_claims)) -> str:
+    """
+    FastAPI dependency to get current authenticated user from JWT token.
+    
+    Returns:
+        Username from validated token
+    
+    Raises:
+        HTTPException: If token is invalid or missing
+    """
+    return claims[0]
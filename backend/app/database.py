@@ -1,17 +1,171 @@
 import os
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from .core.metrics import instrument_engine
 
 # Load environment variables
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./database.db")
 
-engine = create_engine(
-    DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Serve the CRUD routes from async handlers on an async engine
+ASYNC_DB = os.getenv("ASYNC_DB", "false").lower() in ("1", "true", "yes")
+
+# Optional read-only replica used by the GET endpoints
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL", "")
+
+# Team of rows created before teams existed, and of users without one
+DEFAULT_TEAM = os.getenv("DEFAULT_TEAM", "default")
+
+# SQLite profile
+SQLITE_WAL = os.getenv("SQLITE_WAL", "true").lower() in ("1", "true", "yes")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))  # negative = KiB
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))
+
+# Server database (Postgres, MySQL, ...) pool profile
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def engine_options(url: str, is_async: bool = False) -> dict:
+    """
+    create_engine keyword arguments for the profile matching `url`:
+    SQLite gets a busy timeout (pragmas are set on connect), anything else
+    gets a tuned connection pool.
+    """
+    if is_sqlite(url):
+        connect_args = {"timeout": SQLITE_BUSY_TIMEOUT_MS / 1000}
+        if not is_async:
+            connect_args["check_same_thread"] = False
+        return {"connect_args": connect_args}
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+def apply_sqlite_pragmas(sync_engine, url: str) -> None:
+    """Set WAL, sync level, cache/mmap sizes and busy timeout on every new connection."""
+    in_memory = ":memory:" in url or url.rstrip("/") in ("sqlite:", "sqlite+aiosqlite:")
+
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if SQLITE_WAL and not in_memory:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+
+def build_engine(url: str, name: str = "primary"):
+    """Create an instrumented sync engine using the profile for its backend."""
+    new_engine = create_engine(url, **engine_options(url))
+    if is_sqlite(url):
+        apply_sqlite_pragmas(new_engine, url)
+    instrument_engine(new_engine, name)
+    return new_engine
+
+
+engine = build_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+read_engine = build_engine(DATABASE_READ_URL, "replica") if DATABASE_READ_URL else engine
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
+
+
+def get_db():
+    """FastAPI dependency yielding a request-scoped session."""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_read_db():
+    """Like get_db, but bound to the read replica when one is configured."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def to_async_url(url: str) -> str:
+    """
+    Map a sync database URL to its async driver:
+    sqlite -> aiosqlite, postgresql -> asyncpg.
+    URLs that already name a driver are returned unchanged.
+    """
+    scheme, sep, rest = url.partition("://")
+    if "+" in scheme:
+        return url
+    if scheme == "sqlite":
+        return f"sqlite+aiosqlite://{rest}"
+    if scheme in ("postgresql", "postgres"):
+        return f"postgresql+asyncpg://{rest}"
+    return url
+
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+
+
+def build_async_engine(url: str, name: str = "async"):
+    """Create an instrumented async engine using the profile for its backend."""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    new_engine = create_async_engine(url, **engine_options(url, is_async=True))
+    if is_sqlite(url):
+        apply_sqlite_pragmas(new_engine.sync_engine, url)
+    instrument_engine(new_engine.sync_engine, name)
+    return new_engine
+
+
+# The async driver is only imported when async mode is enabled
+async_engine = None
+AsyncSessionLocal = None
+AsyncReadSessionLocal = None
+if ASYNC_DB:
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+    async_engine = build_async_engine(ASYNC_DATABASE_URL)
+    AsyncSessionLocal = async_sessionmaker(
+        async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+    async_read_engine = (
+        build_async_engine(to_async_url(DATABASE_READ_URL), "async-replica") if DATABASE_READ_URL else async_engine
+    )
+    AsyncReadSessionLocal = async_sessionmaker(
+        async_read_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+    )
+
+
+async def get_async_db():
+    """FastAPI dependency yielding a request-scoped AsyncSession."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_async_read_db():
+    """Like get_async_db, but bound to the read replica when one is configured."""
+    async with AsyncReadSessionLocal() as db:
+        yield db
@@ -0,0 +1,61 @@
+"""
+Absence duration parsing.
+
+Absences keep the free-form `duration` label the dashboard sends
+("Full Day", "First Half", "Second Half") next to a normalized
+`duration_days` number, so totals can be summed inside the database.
+"""
+
+# Durations offered by the dashboard form, in days
+DURATION_DAYS = {
+    "full day": 1.0,
+    "first half": 0.5,
+    "second half": 0.5,
+}
+
+# Half-day bitmask used by the calendar and overlap checks
+FIRST_HALF = 1
+SECOND_HALF = 2
+FULL_DAY = FIRST_HALF | SECOND_HALF
+
+
+def parse_duration(duration: str) -> float:
+    """
+    Strictly convert a duration label or number of days to days.
+
+    Raises:
+        ValueError: If the value is not a known label or a number in (0, 1]
+    """
+    value = (duration or "").strip().lower()
+    if value in DURATION_DAYS:
+        return DURATION_DAYS[value]
+    try:
+        days = float(value)
+    except ValueError:
+        raise ValueError(
+            f"Unknown duration {duration!r}; use Full Day, First Half, Second Half or a number of days"
+        )
+    if not 0 < days <= 1:
+        raise ValueError("Duration must be more than 0 and at most 1 day")
+    return days
+
+
+def duration_days(duration: str) -> float:
+    """
+    Lenient version of parse_duration for rows stored before validation
+    existed: anything unparseable counts as a full day.
+    """
+    try:
+        return parse_duration(duration)
+    except ValueError:
+        return 1.0
+
+
+def duration_code(duration: str) -> int:
+    """Map a duration string onto the half-day bitmask."""
+    value = (duration or "").strip().lower()
+    if value == "first half":
+        return FIRST_HALF
+    if value == "second half":
+        return SECOND_HALF
+    return FULL_DAY if duration_days(duration) >= 1 else FIRST_HALF
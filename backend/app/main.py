@@ -1,13 +1,41 @@
 import os
-from fastapi import FastAPI
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
-from .api import auth, people, types, absences
+from .api import auth, people, types, absences, changes, search, holidays, reports
+from .core import metrics
+from .database import ASYNC_DB
+from .migrate import AUTO_MIGRATE, bootstrap
+from .services.provisioning import qr_renderer
+from .services.report_jobs import report_jobs
+from .services.write_batcher import absence_batcher
 
 # Load environment variables
 load_dotenv()
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schema bootstrap can be turned off and run as `python -m app.migrate`
+    if AUTO_MIGRATE:
+        bootstrap()
+    metrics.mark_ready()
+    yield
+    # Commit absences still queued for a write batch
+    absence_batcher.stop()
+    report_jobs.shutdown()
+    qr_renderer.shutdown()
+
+app = FastAPI(lifespan=lifespan)
+
+# Per-route latency and SQL metrics, served on /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Bearer token required to scrape /metrics
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Serve /metrics without a token; otherwise it is refused until one is set
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "false").lower() in ("1", "true", "yes")
 
 # Configure CORS from environment variable
 cors_origins = os.getenv("CORS_ORIGINS", "*").split(",")
@@ -17,9 +45,34 @@ app.add_middleware(
     allow_origins=cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "X-Absence-Conflicts"],
 )
 
+# Async handlers are registered first so they take precedence over the
+# sync ones on the same paths
+if ASYNC_DB:
+    app.include_router(people.async_router, prefix="/api", tags=["people"])
+    app.include_router(types.async_router, prefix="/api", tags=["types"])
+    app.include_router(absences.async_router, prefix="/api", tags=["absences"])
+
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(people.router, prefix="/api", tags=["people"])
 app.include_router(types.router, prefix="/api", tags=["types"])
-app.include_router(absences.router, prefix="/api", tags=["absences"])
\ No newline at end of file
+app.include_router(absences.router, prefix="/api", tags=["absences"])
+app.include_router(changes.router, prefix="/api", tags=["changes"])
+app.include_router(search.router, prefix="/api", tags=["search"])
+app.include_router(holidays.router, prefix="/api", tags=["holidays"])
+app.include_router(reports.router, prefix="/api", tags=["reports"])
+
+if METRICS_ENABLED:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    def read_metrics(request: Request):
+        if METRICS_TOKEN:
+            supplied = request.headers.get("authorization", "").removeprefix("Bearer ")
+            if not secrets.compare_digest(supplied, METRICS_TOKEN):
+                raise HTTPException(status_code=401, detail="Invalid metrics token")
+        elif not METRICS_PUBLIC:
+            raise HTTPException(status_code=403, detail="Set METRICS_TOKEN, or METRICS_PUBLIC=true, to scrape metrics")
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,192 @@
+"""
+Explicit schema bootstrap.
+
+Creates missing tables, adds columns and indexes introduced after a table
+was first created (filling new columns from existing data), rebuilds SQLite
+tables that gained AUTOINCREMENT, installs the search index, and backfills derived tables (rollups, daily coverage) the
+first time they appear next to existing absences. A derived table whose
+columns changed is dropped and rebuilt rather than altered. Run it once per deploy:
+
+    python -m app.migrate
+
+or leave AUTO_MIGRATE enabled to run it from the app's startup hook.
+"""
+import os
+from sqlalchemy import inspect, select, update
+from sqlalchemy.schema import CreateTable
+from sqlalchemy.orm import Session
+from .database import Base, DEFAULT_TEAM, engine
+from . import models  # noqa: F401  registers tables on Base.metadata
+from .durations import duration_days
+from .services.coverage import rebuild_coverage
+from .services.rollups import rebuild_rollups
+from .services import search
+
+# Run bootstrap() from the FastAPI startup hook
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "true").lower() in ("1", "true", "yes")
+
+# Derived tables and the function that fills them from absences
+BACKFILLS = {
+    "absence_rollups": rebuild_rollups,
+    "daily_coverage": rebuild_coverage,
+}
+
+# Indexes superseded by a wider one: table -> index names
+OBSOLETE_INDEXES = {
+    "absences": ["ix_absences_person_id_date", "ix_absences_date_id"],
+    # Names became unique per team
+    "people": ["ix_people_name"],
+    "types": ["ix_types_name"],
+}
+
+
+def backfill_duration_days(db: Session) -> int:
+    """
+    Fill absences.duration_days from the duration strings, with one UPDATE
+    per distinct string. Returns the number of rows updated.
+    """
+    Absence = models.Absence
+    labels = db.scalars(
+        select(Absence.duration).where(Absence.duration_days.is_(None)).distinct()
+    ).all()
+    updated = 0
+    for label in labels:
+        condition = Absence.duration.is_(None) if label is None else Absence.duration == label
+        result = db.execute(
+            update(Absence)
+            .where(condition, Absence.duration_days.is_(None))
+            .values(duration_days=duration_days(label))
+        )
+        updated += result.rowcount
+    db.commit()
+    return updated
+
+
+def backfill_team(table_name: str):
+    """Backfill for a new team column: existing rows join DEFAULT_TEAM."""
+    def backfill(db: Session) -> int:
+        table = Base.metadata.tables[table_name]
+        result = db.execute(update(table).where(table.c.team.is_(None)).values(team=DEFAULT_TEAM))
+        db.commit()
+        return result.rowcount
+    return backfill
+
+
+# Columns added after their table shipped, and how to fill them
+COLUMN_BACKFILLS = {
+    ("absences", "duration_days"): backfill_duration_days,
+    ("users", "team"): backfill_team("users"),
+    ("people", "team"): backfill_team("people"),
+    ("types", "team"): backfill_team("types"),
+    ("absences", "team"): backfill_team("absences"),
+    ("changes", "team"): backfill_team("changes"),
+}
+
+
+def add_missing_columns(bind, log) -> None:
+    """ALTER TABLE ... ADD COLUMN for model columns the database lacks."""
+    inspector = inspect(bind)
+    for table in Base.metadata.sorted_tables:
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in present:
+                continue
+            column_type = column.type.compile(dialect=bind.dialect)
+            with bind.begin() as conn:
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"
+                )
+            log(f"Added column {table.name}.{column.name}")
+            backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+            if backfill:
+                with Session(bind=bind) as db:
+                    count = backfill(db)
+                log(f"Backfilled {table.name}.{column.name} on {count} rows")
+
+
+# Tables whose rows keep ids handed out by an AUTOINCREMENT table, which
+# must continue past them when rebuilt
+SHARED_IDS = {
+    "absences": ["absences_archive"],
+}
+
+
+def enable_autoincrement(bind, log) -> None:
+    """
+    Rebuild SQLite tables declared with sqlite_autoincrement but created
+    without it, copying their rows, so ids of deleted rows are never reused.
+    Their search index is dropped with them for search.install to rebuild.
+    """
+    if bind.dialect.name != "sqlite":
+        return
+    for table in Base.metadata.sorted_tables:
+        if not table.dialect_options["sqlite"]["autoincrement"]:
+            continue
+        with bind.begin() as conn:
+            ddl = conn.exec_driver_sql(
+                "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table.name,)
+            ).scalar()
+            if ddl is None or "AUTOINCREMENT" in ddl.upper():
+                continue
+            create = str(CreateTable(table).compile(dialect=bind.dialect)).strip()
+            conn.exec_driver_sql(create.replace(f"CREATE TABLE {table.name} ", f"CREATE TABLE {table.name}_new ", 1))
+            columns = ", ".join(column.name for column in table.columns)
+            conn.exec_driver_sql(f"INSERT INTO {table.name}_new ({columns}) SELECT {columns} FROM {table.name}")
+            # Its indexes and search triggers go with it; bootstrap recreates them
+            conn.exec_driver_sql(f"DROP TABLE {table.name}")
+            for fts, src, _ in search.INDEXES:
+                if src == table.name:
+                    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {fts}")
+            conn.exec_driver_sql(f"ALTER TABLE {table.name}_new RENAME TO {table.name}")
+            last_id = max(
+                conn.exec_driver_sql(f"SELECT coalesce(max(id), 0) FROM {name}").scalar()
+                for name in [table.name, *SHARED_IDS.get(table.name, [])]
+            )
+            conn.exec_driver_sql("DELETE FROM sqlite_sequence WHERE name = ?", (table.name,))
+            conn.exec_driver_sql("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table.name, last_id))
+        log(f"Rebuilt {table.name} with AUTOINCREMENT")
+
+
+def bootstrap(bind=None, log=print) -> list[str]:
+    """Bring the database schema up to date. Returns the tables it created."""
+    bind = bind or engine
+    existing = set(inspect(bind).get_table_names())
+    for table_name in BACKFILLS:
+        if table_name in existing:
+            table = Base.metadata.tables[table_name]
+            present = {column["name"] for column in inspect(bind).get_columns(table_name)}
+            if set(table.columns.keys()) - present:
+                table.drop(bind=bind)
+                existing.discard(table_name)
+                log(f"Dropped {table_name} to rebuild it")
+    Base.metadata.create_all(bind=bind)
+
+    # create_all only adds columns and indexes together with a new table
+    add_missing_columns(bind, log)
+    enable_autoincrement(bind, log)
+    for table in Base.metadata.sorted_tables:
+        if table.name in existing:
+            for index in table.indexes:
+                index.create(bind=bind, checkfirst=True)
+            present = {index["name"] for index in inspect(bind).get_indexes(table.name)}
+            for name in OBSOLETE_INDEXES.get(table.name, []):
+                if name in present:
+                    with bind.begin() as conn:
+                        conn.exec_driver_sql(f"DROP INDEX {name}")
+                    log(f"Dropped index {name}")
+
+    created = [table.name for table in Base.metadata.sorted_tables if table.name not in existing]
+    for table_name in created:
+        log(f"Created table {table_name}")
+    search.install(bind, log)
+    if "absences" in existing:
+        for table_name, rebuild in BACKFILLS.items():
+            if table_name in created:
+                with Session(bind=bind) as db:
+                    count = rebuild(db)
+                log(f"Backfilled {table_name} from {count} absences")
+    return created
+
+
+if __name__ == "__main__":
+    bootstrap()
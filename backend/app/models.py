@@ -1,7 +1,8 @@
 
-from sqlalchemy import Column, Integer, String, Date, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, ForeignKey, Index, UniqueConstraint
 from sqlalchemy.orm import relationship
-from .database import Base
+from .database import Base, DEFAULT_TEAM
 
 class User(Base):
     __tablename__ = "users"
@@ -10,6 +11,8 @@ class User(Base):
     username = Column(String, unique=True, index=True)
     password = Column(String)
     otp_secret = Column(String)
+    # Team whose people and absences the user sees
+    team = Column(String, default=DEFAULT_TEAM)
 
 class Absence(Base):
     __tablename__ = "absences"
@@ -17,25 +20,114 @@ class Absence(Base):
     id = Column(Integer, primary_key=True, index=True)
     date = Column(Date)
     duration = Column(String)
+    # Normalized length in days, derived from duration
+    duration_days = Column(Float)
     reason = Column(String)
     type_id = Column(Integer, ForeignKey("types.id"))
     person_id = Column(Integer, ForeignKey("people.id"))
+    team = Column(String, nullable=False, default=DEFAULT_TEAM)
 
     type = relationship("Type", back_populates="absences")
     person = relationship("People", back_populates="absences")
 
+    __table_args__ = (
+        # Per-person date range lookups; covers per-person day totals
+        Index("ix_absences_person_id_date_days", "person_id", "date", "type_id", "duration_days"),
+        # Keyset pagination ordered by (date, id) within a team
+        Index("ix_absences_team_date_id", "team", "date", "id"),
+        # Archived absences keep their ids, so SQLite must never hand them out again
+        {"sqlite_autoincrement": True},
+    )
+
+# Absences moved out of the hot table by app.services.archive, ids kept
+class ArchivedAbsence(Base):
+    __tablename__ = "absences_archive"
+
+    id = Column(Integer, primary_key=True)
+    date = Column(Date)
+    duration = Column(String)
+    duration_days = Column(Float)
+    reason = Column(String)
+    type_id = Column(Integer, ForeignKey("types.id"))
+    person_id = Column(Integer, ForeignKey("people.id"))
+    team = Column(String, nullable=False, default=DEFAULT_TEAM)
+
+    __table_args__ = (
+        Index("ix_absences_archive_person_id_date", "person_id", "date"),
+        Index("ix_absences_archive_team_date_id", "team", "date", "id"),
+    )
+
 class People(Base):
     __tablename__ = "people"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True)
+    name = Column(String)
+    team = Column(String, nullable=False, default=DEFAULT_TEAM)
 
     absences = relationship("Absence", back_populates="person")
 
+    __table_args__ = (
+        # Names are unique within a team
+        Index("ix_people_team_name", "team", "name", unique=True),
+    )
+
 class Type(Base):
     __tablename__ = "types"
 
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, index=True)
+    name = Column(String)
+    team = Column(String, nullable=False, default=DEFAULT_TEAM)
 
     absences = relationship("Absence", back_populates="type")
+
+    __table_args__ = (
+        Index("ix_types_team_name", "team", "name", unique=True),
+    )
+
+class AbsenceRollup(Base):
+    __tablename__ = "absence_rollups"
+
+    id = Column(Integer, primary_key=True, index=True)
+    team = Column(String, nullable=False, default=DEFAULT_TEAM)
+    person_id = Column(Integer, ForeignKey("people.id"), nullable=False)
+    type_id = Column(Integer, ForeignKey("types.id"), nullable=False)
+    year = Column(Integer, nullable=False)
+    month = Column(Integer, nullable=False)
+    absence_count = Column(Integer, nullable=False, default=0)
+    total_days = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        UniqueConstraint("team", "person_id", "type_id", "year", "month", name="uq_absence_rollups_bucket"),
+        Index("ix_absence_rollups_year_month", "year", "month"),
+    )
+
+class DailyCoverage(Base):
+    __tablename__ = "daily_coverage"
+
+    team = Column(String, primary_key=True, default=DEFAULT_TEAM)
+    date = Column(Date, primary_key=True)
+    people_off = Column(Integer, nullable=False, default=0)
+    days_off = Column(Float, nullable=False, default=0.0)
+
+class Change(Base):
+    __tablename__ = "changes"
+
+    # Monotonic change version, used as the delta-sync cursor
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    entity = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    # "upsert" or "delete" (a tombstone)
+    op = Column(String, nullable=False)
+    team = Column(String, default=DEFAULT_TEAM)
+    changed_at = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+
+    # Never reuse ids of pruned rows, so cursors only move forward
+    __table_args__ = {"sqlite_autoincrement": True}
+
+class Holiday(Base):
+    __tablename__ = "holidays"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # Public holiday; not a working day even when it falls on a working weekday
+    date = Column(Date, unique=True, nullable=False, index=True)
+    name = Column(String, nullable=False)
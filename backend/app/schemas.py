@@ -1,6 +1,8 @@
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from datetime import date
+from typing import Literal, Optional
+from .durations import parse_duration
 
 class UserBase(BaseModel):
     username: str
@@ -29,6 +31,27 @@ class RegisterResponse(BaseModel):
     username: str
     id: int
 
+class ProvisionUser(UserBase):
+    # Generated, and returned in the bundle, when omitted
+    password: Optional[str] = None
+
+class ProvisionRequest(BaseModel):
+    users: list[ProvisionUser] = Field(..., min_length=1)
+    # "svg" avoids PIL; "uri" returns only the otpauth:// URI to render client-side
+    qr: Literal["png", "svg", "uri"] = "png"
+
+class ProvisionedUser(BaseModel):
+    id: int
+    username: str
+    team: str
+    secret: str
+    otp_uri: str
+    qr: Optional[str] = None
+    password: Optional[str] = None
+
+class ProvisionResult(BaseModel):
+    users: list[ProvisionedUser]
+
 class PasswordChange(BaseModel):
     username: str
     old_password: str
@@ -37,12 +60,20 @@ class PasswordChange(BaseModel):
 class AbsenceBase(BaseModel):
     date: date
     duration: str
+    duration_days: Optional[float] = None
     reason: str
     type_id: int
     person_id: int
 
 class AbsenceCreate(AbsenceBase):
-    pass
+    @model_validator(mode="after")
+    def normalize_duration(self):
+        days = parse_duration(self.duration)
+        if self.duration_days is None:
+            self.duration_days = days
+        elif self.duration_days != days:
+            raise ValueError("duration_days does not match duration")
+        return self
 
 class Absence(AbsenceBase):
     id: int
@@ -50,6 +81,50 @@ class Absence(AbsenceBase):
     class Config:
         from_attributes = True
 
+class AbsenceExpanded(Absence):
+    # Present only when requested with ?expand=person,type
+    person: Optional["People"] = None
+    type: Optional["Type"] = None
+
+class AbsenceSummary(BaseModel):
+    person_id: int
+    type_id: int
+    year: int
+    month: Optional[int] = None
+    absence_count: int
+    total_days: float
+    # Days off that fell on working days; only with ?working_days=true
+    working_days: Optional[float] = None
+
+class AbsenceCalendar(BaseModel):
+    start_date: date
+    end_date: date
+    days: int
+    person_ids: list[int]
+    # One row per person, one cell per day: type_id * 4 + duration code
+    cells: list[list[int]]
+
+class CoverageDay(BaseModel):
+    date: date
+    people_off: int
+    days_off: float
+    person_ids: Optional[list[int]] = None
+
+class AbsenceCoverage(BaseModel):
+    start_date: date
+    end_date: date
+    days: list[CoverageDay]
+    person_ids: Optional[list[int]] = None
+
+class AbsenceImportError(BaseModel):
+    row: int
+    error: str
+
+class AbsenceImportResult(BaseModel):
+    imported: int
+    failed: int
+    errors: list[AbsenceImportError]
+
 class PeopleBase(BaseModel):
     name: str
 
@@ -73,3 +148,75 @@ class Type(TypeBase):
 
     class Config:
         from_attributes = True
+
+class HolidayBase(BaseModel):
+    date: date
+    name: str
+
+class HolidayCreate(HolidayBase):
+    pass
+
+class Holiday(HolidayBase):
+    id: int
+
+    class Config:
+        from_attributes = True
+
+class WorkingDays(BaseModel):
+    start_date: date
+    end_date: date
+    calendar_days: int
+    working_days: int
+
+class ReportRequest(BaseModel):
+    year: int
+    format: Literal["csv", "xlsx"] = "csv"
+    person_id: Optional[int] = None
+    type_id: Optional[int] = None
+
+class ReportJob(BaseModel):
+    id: str
+    status: Literal["queued", "running", "done", "failed"]
+    format: str
+    error: Optional[str] = None
+
+class BulkDelete(BaseModel):
+    ids: list[int]
+    # What happens to absences that reference the deleted rows
+    absences: Literal["restrict", "delete", "reassign"]
+    reassign_to: Optional[int] = None
+
+class BulkRenameItem(BaseModel):
+    id: int
+    name: str
+
+class BulkRename(BaseModel):
+    items: list[BulkRenameItem]
+
+class Merge(BaseModel):
+    source_ids: list[int]
+    target_id: int
+
+class BulkResult(BaseModel):
+    affected: int
+    absences: int
+
+class ChangeSet(BaseModel):
+    # Pass back as ?since= to get the next changes
+    cursor: int
+    # More changes are waiting past this page
+    more: bool
+    absences: list[Absence]
+    people: list["People"]
+    types: list["Type"]
+    # Ids removed since the cursor, by entity
+    deleted: dict[str, list[int]]
+
+class SearchResults(BaseModel):
+    # Best matches first
+    people: list["People"]
+    absences: list[Absence]
+
+AbsenceExpanded.model_rebuild()
+ChangeSet.model_rebuild()
+SearchResults.model_rebuild()
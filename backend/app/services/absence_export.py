@@ -0,0 +1,80 @@
+"""
+Constant-memory CSV/NDJSON export of absences, and the column-only absence
+query shared with the list endpoints.
+
+Rows are fetched as plain tuples in fixed-size batches (server-side cursor
+where the driver supports it) and encoded straight to text, so neither ORM
+objects nor Pydantic models are built and memory does not grow with the table.
+"""
+import csv
+import io
+from typing import Iterable, Iterator
+import orjson
+from sqlalchemy import select
+from ..models import Absence, People, Type
+
+BATCH_SIZE = 1000
+
+COLUMNS = ["id", "date", "duration", "duration_days", "reason", "type_id", "person_id"]
+
+
+def absence_columns(expand: set[str] = frozenset(), model=Absence):
+    """
+    Column-only select from `model` (Absence or ArchivedAbsence), joined to
+    the person and/or type names listed in `expand`. Returns the statement
+    and its column names.
+    """
+    stmt = select(
+        model.id, model.date, model.duration, model.duration_days,
+        model.reason, model.type_id, model.person_id,
+    )
+    keys = list(COLUMNS)
+    if "person" in expand:
+        stmt = stmt.add_columns(People.name).outerjoin(People, model.person_id == People.id)
+        keys.append("person_name")
+    if "type" in expand:
+        stmt = stmt.add_columns(Type.name).outerjoin(Type, model.type_id == Type.id)
+        keys.append("type_name")
+    return stmt, keys
+
+
+def absence_records(rows: Iterable, keys: list[str]) -> list[dict]:
+    """
+    Rows from absence_columns() as schemas.AbsenceExpanded-shaped dicts,
+    with names nested as person/type and None fields left out.
+    """
+    records = []
+    for row in rows:
+        record = {key: value for key, value in zip(keys, row) if value is not None}
+        if "person_name" in record:
+            record["person"] = {"name": record.pop("person_name"), "id": record["person_id"]}
+        if "type_name" in record:
+            record["type"] = {"name": record.pop("type_name"), "id": record["type_id"]}
+        records.append(record)
+    return records
+
+
+def iter_csv(rows: Iterable, keys: list[str], batch_size: int = BATCH_SIZE) -> Iterator[str]:
+    """Encode rows as CSV, yielding one text chunk per batch."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(keys)
+    for i, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if i % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows: Iterable, keys: list[str], batch_size: int = BATCH_SIZE) -> Iterator[bytes]:
+    """Encode rows as one JSON object per line, one chunk per batch."""
+    lines = []
+    for row in rows:
+        lines.append(orjson.dumps(dict(zip(keys, row))))
+        if len(lines) >= batch_size:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+    if lines:
+        yield b"\n".join(lines) + b"\n"
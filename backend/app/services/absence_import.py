@@ -0,0 +1,185 @@
+"""
+Streaming bulk import of absences from CSV or NDJSON.
+
+Rows are read lazily from the upload, validated against
+schemas.AbsenceCreate in chunks, and written with one multi-row INSERT per
+chunk in its own transaction. A bad row is reported and skipped; it never
+aborts the rest of the file.
+"""
+import csv
+import io
+import json
+from typing import IO, Iterator
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..models import People, Type
+from .. import schemas
+from . import coverage
+from .absence_writes import AbsenceReferenceError, add_absences
+from .calendar import calendar_cache
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+
+def iter_csv(stream: IO[bytes]) -> Iterator[dict | Exception]:
+    """
+    Yield one dict per CSV row, keyed by the header line.
+    Malformed rows are yielded as the exception so reading can continue.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.strip() for name in header]
+    while True:
+        try:
+            values = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            yield e
+            continue
+        if values:
+            yield dict(zip(header, values))
+
+
+def iter_ndjson(stream: IO[bytes]) -> Iterator[dict | Exception]:
+    """
+    Yield one dict per non-blank NDJSON line.
+    Unparseable lines are yielded as the exception so reading can continue.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield e
+            continue
+        if not isinstance(row, dict):
+            yield ValueError("Expected a JSON object")
+            continue
+        yield row
+
+
+def resolve_row(
+    row: dict,
+    people: dict[str, int],
+    types: dict[str, int],
+    person_ids: set[int],
+    type_ids: set[int],
+) -> schemas.AbsenceCreate:
+    """
+    Validate a raw row, replacing `person`/`type` names with their ids.
+    Rows may carry either `person_id` or `person` (and `type_id` or `type`).
+    """
+    row = dict(row)
+    person = row.pop("person", None)
+    if not row.get("person_id") and person:
+        if person not in people:
+            raise ValueError(f"Unknown person: {person}")
+        row["person_id"] = people[person]
+    type_name = row.pop("type", None)
+    if not row.get("type_id") and type_name:
+        if type_name not in types:
+            raise ValueError(f"Unknown type: {type_name}")
+        row["type_id"] = types[type_name]
+    absence = schemas.AbsenceCreate(**row)
+    if absence.person_id not in person_ids:
+        raise ValueError(f"Unknown person_id: {absence.person_id}")
+    if absence.type_id not in type_ids:
+        raise ValueError(f"Unknown type_id: {absence.type_id}")
+    return absence
+
+
+def import_absences(
+    db: Session,
+    rows: Iterator[dict | Exception],
+    chunk_size: int = CHUNK_SIZE,
+    overlap: str = coverage.ABSENCE_OVERLAP_POLICY,
+) -> dict:
+    """
+    Validate and insert absences from an iterator of raw row dicts.
+    Each chunk of valid rows is committed on its own so a large file never
+    holds the write lock for long. With overlap="reject", rows overlapping an
+    existing absence (or an earlier row of the file) are reported as errors.
+    """
+    people = dict(db.query(People.name, People.id).all())
+    types = dict(db.query(Type.name, Type.id).all())
+    person_ids = set(people.values())
+    type_ids = set(types.values())
+    result = {"imported": 0, "failed": 0, "errors": []}
+    chunk: list[tuple[int, dict]] = []
+
+    def fail(line: int, message: str):
+        result["failed"] += 1
+        if len(result["errors"]) < MAX_REPORTED_ERRORS:
+            result["errors"].append({"row": line, "error": message})
+
+    # Row numbers count data rows only (the CSV header is not a row)
+    for line, raw in enumerate(rows, start=1):
+        if isinstance(raw, Exception):
+            fail(line, str(raw))
+            continue
+        try:
+            absence = resolve_row(raw, people, types, person_ids, type_ids)
+        except ValidationError as e:
+            fail(line, "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+            continue
+        except (ValueError, TypeError) as e:
+            fail(line, str(e))
+            continue
+        chunk.append((line, absence.model_dump()))
+        if len(chunk) >= chunk_size:
+            result["imported"] += _flush(db, chunk, overlap, fail)
+            chunk = []
+    if chunk:
+        result["imported"] += _flush(db, chunk, overlap, fail)
+    return result
+
+
+def _flush(db: Session, chunk: list[tuple[int, dict]], overlap: str, fail) -> int:
+    """
+    Insert one chunk with its rollup and coverage deltas in a single
+    transaction. Overlapping rows are passed to `fail` when rejecting, and
+    so are rows naming a person or type deleted since the import started.
+    """
+    try:
+        results = add_absences(db, [row for _, row in chunk], overlap)
+        db.commit()
+        calendar_cache.invalidate()
+    except AbsenceReferenceError:
+        # A person or type was deleted since the import started
+        db.rollback()
+        existing = {
+            key: set(db.scalars(select(model.id).where(model.id.in_({row[key] for _, row in chunk}))))
+            for model, key in ((People, "person_id"), (Type, "type_id"))
+        }
+        valid = []
+        for line, row in chunk:
+            missing = [key for key, ids in existing.items() if row[key] not in ids]
+            if missing:
+                fail(line, f"Unknown {missing[0]}: {row[missing[0]]}")
+            else:
+                valid.append((line, row))
+        if len(valid) == len(chunk):
+            raise
+        return _flush(db, valid, overlap, fail) if valid else 0
+    except Exception:
+        db.rollback()
+        raise
+    imported = 0
+    for (line, _), (stored, _) in zip(chunk, results):
+        if stored is None:
+            fail(line, "Absence overlaps an existing absence for this person and date")
+        else:
+            imported += 1
+    return imported
+
@@ -0,0 +1,146 @@
+"""
+Write paths for new absences.
+
+Keeps the overlap check and every derived table (rollups, daily coverage)
+in the caller's transaction, so sync and async handlers stay consistent.
+The people written for are locked before the check, so concurrent requests
+for the same person can't both pass it.
+add_absence stages one ORM object; add_absences stages many rows with
+set-based statements for bulk import and batched creates.
+"""
+from collections import defaultdict
+from typing import Optional
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from ..durations import duration_code
+from ..models import Absence, People, Type
+from ..tenancy import current_team
+from . import changes, coverage, rollups
+
+
+class AbsenceOverlapError(ValueError):
+    """Raised when a new absence overlaps existing ones and the policy is reject."""
+
+    def __init__(self, conflicts: list[int]):
+        super().__init__("Absence overlaps an existing absence for this person and date")
+        self.conflicts = conflicts
+
+
+class AbsenceReferenceError(LookupError):
+    """Raised when an absence names a person or type its team doesn't have."""
+
+
+def check_references(db: Session, rows: list[dict]) -> None:
+    """Raise AbsenceReferenceError unless the session's team has every person and type named."""
+    for model, key in ((People, "person_id"), (Type, "type_id")):
+        wanted = {row[key] for row in rows}
+        found = set(db.scalars(select(model.id).where(model.id.in_(wanted))))
+        missing = sorted(wanted - found)
+        if missing:
+            raise AbsenceReferenceError(f"Unknown {key}: {', '.join(map(str, missing))}")
+
+
+def lock_people(db: Session, person_ids: set[int]) -> None:
+    """
+    Hold the people's write lock until the caller commits: SQLite takes its
+    database write lock up front (BEGIN IMMEDIATE), other databases lock the
+    people rows (SELECT ... FOR UPDATE).
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        connection = db.connection()
+        # Already writing means the lock is held
+        if not connection.connection.driver_connection.in_transaction:
+            connection.exec_driver_sql("BEGIN IMMEDIATE")
+        return
+    db.execute(select(People.id).where(People.id.in_(sorted(person_ids))).order_by(People.id).with_for_update())
+
+
+def add_absence(db: Session, data: dict, overlap: str = coverage.ABSENCE_OVERLAP_POLICY) -> tuple[Absence, list[int]]:
+    """
+    Stage a new absence and its derived rows. Does not commit.
+
+    Returns the absence and the ids of overlapping absences (empty unless
+    the policy is flag or allow).
+    """
+    lock_people(db, {data["person_id"]})
+    check_references(db, [data])
+    mask, conflicts = coverage.find_conflicts(db, data["person_id"], data["date"], data["duration"])
+    if conflicts and overlap == "reject":
+        raise AbsenceOverlapError(conflicts)
+    absence = Absence(**data)
+    db.add(absence)
+    rollups.apply_absence(db, absence)
+    coverage.apply_absence(db, absence, mask)
+    return absence, conflicts
+
+
+def add_absences(
+    db: Session, rows: list[dict], overlap: str | list[str] = coverage.ABSENCE_OVERLAP_POLICY
+) -> list[tuple[Optional[dict], list[int]]]:
+    """
+    Stage many new absences with one overlap query, one multi-row INSERT and
+    one upsert per touched rollup bucket and day. Rows are checked in order,
+    so a row also overlaps earlier rows of the same call. `overlap` is one
+    policy for all rows or one per row. Does not commit.
+
+    Returns, per row, the stored row (with its id, or None if rejected as an
+    overlap) and the ids of the absences it overlaps.
+    """
+    policies = overlap if isinstance(overlap, list) else [overlap] * len(rows)
+    if rows:
+        lock_people(db, {row["person_id"] for row in rows})
+        check_references(db, rows)
+    team = current_team(db)
+    existing = coverage.existing_absences(db, {(row["person_id"], row["date"]) for row in rows})
+    masks = {key: _mask(found) for key, found in existing.items()}
+    # Accepted rows per (person_id, date), as (index in accepted, code)
+    staged: dict = defaultdict(list)
+    accepted: list[dict] = []
+    checked = []
+    buckets: dict[tuple[int, int, int, int], list] = {}
+    daily: dict = {}
+    for row, policy in zip(rows, policies):
+        key = (row["person_id"], row["date"])
+        code = duration_code(row["duration"])
+        conflicts = [absence_id for absence_id, other in existing.get(key, ()) if other & code]
+        earlier = [index for index, other in staged[key] if other & code]
+        if (conflicts or earlier) and policy == "reject":
+            checked.append((None, conflicts, earlier))
+            continue
+        bucket = buckets.setdefault(
+            (row["person_id"], row["type_id"], row["date"].year, row["date"].month), [0, 0.0]
+        )
+        bucket[0] += 1
+        bucket[1] += row["duration_days"]
+        day = daily.setdefault(row["date"], [0, 0.0])
+        day[0] += 0 if masks.get(key) else 1
+        day[1] += row["duration_days"]
+        masks[key] = masks.get(key, 0) | code
+        staged[key].append((len(accepted), code))
+        checked.append((len(accepted), conflicts, earlier))
+        accepted.append({**row, "team": team})
+
+    ids = []
+    if accepted:
+        ids = db.scalars(
+            insert(Absence).returning(Absence.id, sort_by_parameter_order=True), accepted
+        ).all()
+        changes.record(db, "absences", ids)
+        for (person_id, type_id, year, month), (count, days) in buckets.items():
+            rollups.apply_delta(db, person_id, type_id, year, month, count, days)
+        for day, (people, days) in daily.items():
+            coverage.apply_day(db, day, people, days)
+    return [
+        (
+            None if index is None else {**accepted[index], "id": ids[index]},
+            sorted(conflicts + [ids[i] for i in earlier]),
+        )
+        for index, conflicts, earlier in checked
+    ]
+
+
+def _mask(found: list[tuple[int, int]]) -> int:
+    mask = 0
+    for _, code in found:
+        mask |= code
+    return mask
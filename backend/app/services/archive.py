@@ -0,0 +1,143 @@
+"""
+Hot/cold split of the absences table.
+
+Absences dated before the cutoff (January 1st, ARCHIVE_KEEP_YEARS - 1 years
+back: by default last year and this year stay hot) are moved to
+absences_archive by
+
+    python -m app.services.archive [--before YYYY-MM-DD]
+
+in batches of ARCHIVE_BATCH_SIZE rows, each its own short transaction, so
+writers are only ever held up for one batch. Ids are kept, and rollups and
+daily coverage still count archived absences, so year summaries and
+coverage don't change. The hot table and its indexes only hold recent rows.
+
+Reads ask absence_tables() which tables their date range reaches: the
+archive is only added for open-ended ranges and ranges starting on or
+before the newest archived date (one index seek), so current-year queries
+never touch it.
+Search covers the hot table only.
+"""
+import heapq
+import os
+import time
+from datetime import date
+from typing import Iterable, Optional
+from sqlalchemy import delete, func, insert, select, union_all
+from sqlalchemy.orm import Session, aliased
+from ..models import Absence, ArchivedAbsence
+
+ARCHIVE_KEEP_YEARS = int(os.getenv("ARCHIVE_KEEP_YEARS", "2"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "5000"))
+# Pause between batches, letting queued writers take the lock
+ARCHIVE_PAUSE_MS = float(os.getenv("ARCHIVE_PAUSE_MS", "10"))
+
+COLUMNS = [column.key for column in Absence.__table__.columns]
+
+
+def default_cutoff(today: date = None) -> date:
+    today = today or date.today()
+    return date(today.year - ARCHIVE_KEEP_YEARS + 1, 1, 1)
+
+
+def archived_until(db: Session) -> Optional[date]:
+    """Date of the newest archived absence, or None if nothing is archived."""
+    return db.scalar(select(func.max(ArchivedAbsence.date)))
+
+
+def absence_tables(db: Session, start: date = None) -> list:
+    """The absence models holding rows from `start` on: hot, plus archive if it reaches that far."""
+    horizon = archived_until(db)
+    if horizon is None or (start is not None and start > horizon):
+        return [Absence]
+    return [Absence, ArchivedAbsence]
+
+
+def all_absences():
+    """Alias of Absence over the hot and archived rows together."""
+    rows = union_all(
+        select(*(getattr(Absence, key) for key in COLUMNS)),
+        select(*(getattr(ArchivedAbsence, key) for key in COLUMNS)),
+    )
+    return aliased(Absence, rows.subquery("absences_all"))
+
+
+def absence_source(db: Session, start: date = None):
+    """
+    Absence itself, or all_absences() when a range from `start` reaches the
+    archive, for aggregate queries written against Absence columns.
+    """
+    if len(absence_tables(db, start)) == 1:
+        return Absence
+    return all_absences()
+
+
+def merge_ordered(streams: list[Iterable]) -> Iterable:
+    """Merge row streams each ordered by (date, id) into one."""
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=lambda row: (row.date, row.id))
+
+
+def archive_before(
+    db: Session,
+    cutoff: date,
+    batch_size: int = ARCHIVE_BATCH_SIZE,
+    pause_ms: float = ARCHIVE_PAUSE_MS,
+    log=None,
+) -> int:
+    """
+    Move absences dated before `cutoff` to the archive, committing every
+    batch. Returns the number of absences moved.
+    """
+    moved = 0
+    while True:
+        ids = db.scalars(
+            select(Absence.id)
+            .where(Absence.date < cutoff)
+            .order_by(Absence.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            return moved
+        db.execute(insert(ArchivedAbsence).from_select(
+            COLUMNS, select(*(getattr(Absence, key) for key in COLUMNS)).where(Absence.id.in_(ids))
+        ))
+        db.execute(
+            delete(Absence).where(Absence.id.in_(ids)).execution_options(synchronize_session=False)
+        )
+        db.commit()
+        moved += len(ids)
+        if log:
+            log(f"Archived {moved} absences")
+        if pause_ms:
+            time.sleep(pause_ms / 1000)
+
+
+if __name__ == "__main__":
+    import argparse
+    import glob
+    from ..database import SessionLocal
+    from ..migrate import bootstrap
+    from ..tenancy import TENANT_DB_DIR, TENANT_STORAGE, team_session
+
+    parser = argparse.ArgumentParser(description="Move old absences to the archive table.")
+    parser.add_argument("--before", type=date.fromisoformat, default=None,
+                        help="archive absences dated before this day (default: from ARCHIVE_KEEP_YEARS)")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    cutoff = args.before or default_cutoff()
+
+    bootstrap()
+    if TENANT_STORAGE == "files":
+        teams = sorted(os.path.basename(path)[:-3] for path in glob.glob(os.path.join(TENANT_DB_DIR, "*.db")))
+        sessions = [(team, team_session(team)) for team in teams]
+    else:
+        # An unscoped session archives every team in one pass
+        sessions = [("all teams", SessionLocal())]
+    for name, session in sessions:
+        try:
+            count = archive_before(session, cutoff, args.batch_size)
+            print(f"Archived {count} absences dated before {cutoff} ({name})")
+        finally:
+            session.close()
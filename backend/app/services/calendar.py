@@ -0,0 +1,108 @@
+"""
+Person x day absence matrix for the dashboard calendar.
+
+The grid is built from one range query into a flat integer array (one slot
+per person per day) and serialized once. Each cell packs the absence type and
+the part of the day taken:
+
+    cell = type_id * 4 + duration_code
+
+where duration_code is a bitmask (1 = first half, 2 = second half,
+3 = full day) and 0 means present. Results are cached per team, date range and
+data version; absence and people writes invalidate them.
+"""
+import json
+import os
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from datetime import date, timedelta
+from sqlalchemy.orm import Session
+from ..models import People
+from ..durations import FULL_DAY, duration_code
+from ..tenancy import current_team
+from .archive import absence_source
+
+CALENDAR_CACHE_SIZE = int(os.getenv("CALENDAR_CACHE_SIZE", "64"))
+CALENDAR_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "60"))
+
+
+def build_calendar(db: Session, start_date: date, end_date: date) -> dict:
+    """Assemble the packed matrix for an inclusive date range."""
+    days = (end_date - start_date).days + 1
+    person_ids = [person_id for (person_id,) in db.query(People.id).order_by(People.id)]
+    row_of = {person_id: i for i, person_id in enumerate(person_ids)}
+    cells = array("l", [0]) * (days * len(person_ids))
+
+    source = absence_source(db, start_date)
+    rows = db.query(
+        source.person_id, source.date, source.type_id, source.duration
+    ).filter(source.date >= start_date, source.date <= end_date)
+    for person_id, absence_date, type_id, duration in rows:
+        row = row_of.get(person_id)
+        if row is None:
+            continue
+        slot = row * days + (absence_date - start_date).days
+        # Keep half days from earlier absences on the same date
+        code = (cells[slot] & FULL_DAY) | duration_code(duration)
+        cells[slot] = (type_id or 0) * 4 + code
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "days": days,
+        "person_ids": person_ids,
+        "cells": [cells[i * days:(i + 1) * days].tolist() for i in range(len(person_ids))],
+    }
+
+
+class CalendarCache:
+    """Bounded LRU of serialized calendars for the current data version."""
+
+    def __init__(self, max_size: int = CALENDAR_CACHE_SIZE, ttl: float = CALENDAR_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = 0
+        self._version_started = time.monotonic()
+        self._entries: "OrderedDict[tuple, bytes]" = OrderedDict()
+
+    def invalidate(self) -> None:
+        """Drop all cached calendars; call after any committed absence/people write."""
+        with self._lock:
+            self._version += 1
+            self._version_started = time.monotonic()
+            self._entries.clear()
+
+    def get(self, db: Session, start_date: date, end_date: date) -> bytes:
+        """Serialized calendar for the range, built on a miss."""
+        with self._lock:
+            if self.ttl and time.monotonic() - self._version_started >= self.ttl:
+                self._version += 1
+                self._version_started = time.monotonic()
+                self._entries.clear()
+            version = self._version
+            key = (current_team(db), start_date, end_date)
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+                return body
+
+        body = json.dumps(build_calendar(db, start_date, end_date), separators=(",", ":")).encode()
+        with self._lock:
+            if version == self._version and self.max_size > 0:
+                self._entries[key] = body
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return body
+
+
+calendar_cache = CalendarCache()
+
+
+def month_range(month: str) -> tuple[date, date]:
+    """First and last day of a YYYY-MM month."""
+    first = date.fromisoformat(f"{month}-01")
+    next_month = (first.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return first, next_month - timedelta(days=1)
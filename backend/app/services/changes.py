@@ -0,0 +1,169 @@
+"""
+Change log for delta sync.
+
+Every write to absences, people and types appends a row to `changes`, whose
+autoincrement id is the feed cursor. ORM writes are captured by a session
+hook; set-based statements (bulk import, bulk deletes and merges) call
+record() with the ids they touched. Deletes are kept as tombstones until
+pruned after CHANGE_RETENTION_DAYS.
+
+Open change streams are woken in-process after each commit and otherwise
+poll, so writes from other workers still reach them.
+"""
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import delete, event, func, insert, select
+from sqlalchemy.orm import Session
+from ..models import Absence, Change, People, Type
+from ..tenancy import ALL_TEAMS, current_team
+from .archive import absence_tables
+
+# Tombstones older than this are pruned; older cursors must resync
+CHANGE_RETENTION_DAYS = float(os.getenv("CHANGE_RETENTION_DAYS", "30"))
+# How often open streams check for writes made by other processes
+CHANGE_STREAM_POLL_SECONDS = float(os.getenv("CHANGE_STREAM_POLL_SECONDS", "5"))
+
+TRACKED = {Absence: "absences", People: "people", Type: "types"}
+ENTITIES = tuple(TRACKED.values())
+
+PRUNE_INTERVAL_SECONDS = 3600
+_last_prune = 0.0
+
+
+class CursorExpiredError(LookupError):
+    """Raised when a cursor predates the oldest retained change."""
+
+
+def record(db: Session, entity: str, ids, op: str = "upsert") -> None:
+    """Log changes made by set-based statements. Does not commit."""
+    team = current_team(db)
+    rows = [{"entity": entity, "entity_id": entity_id, "op": op, "team": team} for entity_id in ids]
+    if rows:
+        db.connection().execute(insert(Change.__table__), rows)
+        db.info["changes_pending"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _record_flush(session: Session, flush_context) -> None:
+    """Log ORM inserts, updates and deletes of tracked models."""
+    rows = []
+    dirty = [obj for obj in session.dirty if session.is_modified(obj)]
+    for objects, op in ((session.new, "upsert"), (dirty, "upsert"), (session.deleted, "delete")):
+        for obj in objects:
+            entity = TRACKED.get(type(obj))
+            if entity is not None:
+                rows.append({"entity": entity, "entity_id": obj.id, "op": op, "team": obj.team})
+    if rows:
+        session.connection().execute(insert(Change.__table__), rows)
+        session.info["changes_pending"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _notify_commit(session: Session) -> None:
+    if session.info.pop("changes_pending", False):
+        notify()
+        _maybe_prune(session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rollback(session: Session) -> None:
+    session.info.pop("changes_pending", None)
+
+
+def _maybe_prune(session: Session) -> None:
+    """Drop expired tombstones at most once an hour, on a separate connection."""
+    global _last_prune
+    now = time.monotonic()
+    if not CHANGE_RETENTION_DAYS or now - _last_prune < PRUNE_INTERVAL_SECONDS:
+        return
+    _last_prune = now
+    cutoff = datetime.now(timezone.utc) - timedelta(days=CHANGE_RETENTION_DAYS)
+    with session.get_bind().begin() as conn:
+        conn.execute(delete(Change.__table__).where(Change.changed_at < cutoff))
+
+
+def current_cursor(db: Session) -> int:
+    """Id of the session's team's latest change."""
+    return db.scalar(select(func.max(Change.id))) or 0
+
+
+def changes_since(db: Session, since: int, limit: int = 1000) -> dict:
+    """
+    Net changes after `since`: the current rows of everything upserted and
+    the ids of everything deleted, at most `limit` log entries at a time.
+
+    Raises:
+        CursorExpiredError: If changes after `since` were already pruned
+    """
+    if since:
+        # Cursors count every team's changes, so check them against the whole log
+        oldest, newest = db.execute(
+            select(func.min(Change.id), func.max(Change.id)).execution_options(**ALL_TEAMS)
+        ).one()
+        # Pruned past the cursor, or a cursor from another (reset) database
+        if (oldest is not None and oldest > since + 1) or since > (newest or 0):
+            raise CursorExpiredError(f"Cursor {since} has expired; reload and use a new cursor")
+
+    log = db.execute(
+        select(Change.id, Change.entity, Change.entity_id, Change.op)
+        .where(Change.id > since)
+        .order_by(Change.id)
+        .limit(limit + 1)
+    ).all()
+    more = len(log) > limit
+    log = log[:limit]
+
+    # Later entries win, so an upsert followed by a delete is just a delete
+    latest: dict[tuple[str, int], str] = {}
+    for _, entity, entity_id, op in log:
+        latest[(entity, entity_id)] = op
+
+    result = {
+        "cursor": log[-1].id if log else since,
+        "more": more,
+        "deleted": {entity: [] for entity in ENTITIES},
+    }
+    upserted = {entity: [] for entity in ENTITIES}
+    for (entity, entity_id), op in latest.items():
+        (result["deleted"] if op == "delete" else upserted)[entity].append(entity_id)
+    for model, entity in TRACKED.items():
+        ids = upserted[entity]
+        if not ids:
+            result[entity] = []
+            continue
+        # Absences may have been archived since they changed; ids are kept
+        models = absence_tables(db) if model is Absence else [model]
+        result[entity] = sorted(
+            (row for found in models for row in db.query(found).filter(found.id.in_(ids))), key=lambda row: row.id
+        )
+    return result
+
+
+# Event loops of open streams, each with the asyncio.Event it waits on
+_subscribers: set[tuple[asyncio.AbstractEventLoop, asyncio.Event]] = set()
+_subscribers_lock = threading.Lock()
+
+
+def notify() -> None:
+    """Wake every open stream; safe to call from any thread."""
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    for loop, wake in subscribers:
+        loop.call_soon_threadsafe(wake.set)
+
+
+class Subscription:
+    """Context manager giving an asyncio.Event that notify() sets."""
+
+    def __enter__(self) -> asyncio.Event:
+        self.entry = (asyncio.get_running_loop(), asyncio.Event())
+        with _subscribers_lock:
+            _subscribers.add(self.entry)
+        return self.entry[1]
+
+    def __exit__(self, *exc) -> None:
+        with _subscribers_lock:
+            _subscribers.discard(self.entry)
@@ -0,0 +1,162 @@
+"""
+Overlap detection and per-day team coverage.
+
+Overlaps are found with one seek on the (person_id, date) index: the
+half-day bitmasks of that person's absences on the date are OR-ed together
+and compared with the new one. The daily_coverage table keeps, per team and
+date, how many people are off and how many days were taken; it is updated in
+the same transaction as each absence write, so coverage queries read one row
+per day instead of scanning absences.
+"""
+import os
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+from ..models import Absence, DailyCoverage
+from ..durations import duration_code
+from ..tenancy import current_team
+from .archive import absence_source, all_absences
+from .rollups import upsert_increment
+
+# What to do when a new absence overlaps an existing one: reject, flag or allow
+ABSENCE_OVERLAP_POLICY = os.getenv("ABSENCE_OVERLAP_POLICY", "reject")
+
+
+def find_conflicts(db: Session, person_id: int, day: date, duration: str) -> tuple[int, list[int]]:
+    """
+    Return the person's existing half-day mask on `day` and the ids of the
+    absences that overlap a new one of `duration`.
+    """
+    code = duration_code(duration)
+    mask = 0
+    conflicts = []
+    source = absence_source(db, day)
+    rows = db.query(source.id, source.duration).filter(
+        source.person_id == person_id, source.date == day
+    )
+    for absence_id, existing in rows:
+        existing_code = duration_code(existing)
+        mask |= existing_code
+        if existing_code & code:
+            conflicts.append(absence_id)
+    return mask, conflicts
+
+
+def existing_absences(
+    db: Session, keys: set[tuple[int, date]]
+) -> dict[tuple[int, date], list[tuple[int, int]]]:
+    """(id, half-day code) of the absences on many (person_id, date) pairs, in one query."""
+    found: dict[tuple[int, date], list[tuple[int, int]]] = defaultdict(list)
+    if not keys:
+        return found
+    person_ids = {person_id for person_id, _ in keys}
+    days = [day for _, day in keys]
+    source = absence_source(db, min(days))
+    rows = db.query(source.id, source.person_id, source.date, source.duration).filter(
+        source.person_id.in_(person_ids),
+        source.date >= min(days),
+        source.date <= max(days),
+    )
+    for absence_id, person_id, day, duration in rows:
+        if (person_id, day) in keys:
+            found[(person_id, day)].append((absence_id, duration_code(duration)))
+    return found
+
+
+def apply_day(db: Session, day: date, people: int, days: float) -> None:
+    """Upsert a headcount/day delta for one date of the session's team. Does not commit."""
+    upsert_increment(
+        db, DailyCoverage, {"team": current_team(db), "date": day}, {"people_off": people, "days_off": days}
+    )
+
+
+def apply_absence(db: Session, absence: Absence, previous_mask: int) -> None:
+    """
+    Count a new absence in daily coverage; the person adds to the headcount
+    only if they had no other absence that day (previous_mask == 0).
+    """
+    apply_day(db, absence.date, 0 if previous_mask else 1, absence.duration_days)
+
+
+def summarize(
+    db: Session,
+    start_date: date,
+    end_date: date,
+    include_people: bool = False,
+) -> dict:
+    """
+    Per-day headcount off between two dates (inclusive). With include_people,
+    also list who is off, read through the (date, id) index range.
+    """
+    days = [
+        {"date": row.date, "people_off": row.people_off, "days_off": row.days_off}
+        for row in db.query(DailyCoverage)
+        .filter(
+            DailyCoverage.date >= start_date,
+            DailyCoverage.date <= end_date,
+            DailyCoverage.people_off > 0,
+        )
+        .order_by(DailyCoverage.date)
+    ]
+    result = {"start_date": start_date, "end_date": end_date, "days": days}
+    if include_people:
+        people_by_day: dict[date, set[int]] = defaultdict(set)
+        source = absence_source(db, start_date)
+        rows = db.query(source.date, source.person_id).filter(
+            source.date >= start_date, source.date <= end_date
+        )
+        for day, person_id in rows:
+            people_by_day[day].add(person_id)
+        for entry in days:
+            entry["person_ids"] = sorted(people_by_day.get(entry["date"], ()))
+        result["person_ids"] = sorted(set().union(*people_by_day.values()))
+    return result
+
+
+def refresh_coverage(db: Session, dates: list[date] = None) -> None:
+    """
+    Recompute daily_coverage in the database with one grouped
+    INSERT ... SELECT, for every day or only the given dates.
+    Does not commit.
+    """
+    # Archived absences keep counting
+    source = all_absences()
+    grouped = (
+        db.query(
+            source.team,
+            source.date,
+            func.count(func.distinct(source.person_id)),
+            func.coalesce(func.sum(source.duration_days), 0.0),
+        )
+        .filter(source.date.isnot(None))
+        .group_by(source.team, source.date)
+    )
+    stale = db.query(DailyCoverage)
+    if dates is not None:
+        grouped = grouped.filter(source.date.in_(dates))
+        stale = stale.filter(DailyCoverage.date.in_(dates))
+    stale.delete(synchronize_session=False)
+    db.execute(insert(DailyCoverage).from_select(
+        ["team", "date", "people_off", "days_off"], grouped.statement
+    ))
+
+
+def rebuild_coverage(db: Session) -> int:
+    """Recompute daily_coverage from the absences table. Returns rows folded in."""
+    refresh_coverage(db)
+    total = db.query(func.count(Absence.id)).scalar()
+    db.commit()
+    return total
+
+
+if __name__ == "__main__":
+    from ..database import SessionLocal
+    from ..migrate import bootstrap
+
+    bootstrap()
+    session = SessionLocal()
+    try:
+        print(f"Rebuilt daily coverage from {rebuild_coverage(session)} absences")
+    finally:
+        session.close()
@@ -0,0 +1,214 @@
+"""
+Batch user provisioning.
+
+create_users() registers a whole batch in one transaction, and nothing if
+any username is taken, giving each user a TOTP secret and, unless one is
+supplied, a random initial password to change on first sign-in. Their
+enrollment QR codes are rendered afterwards by a pool of PROVISION_WORKERS
+processes, QR_CHUNK_SIZE codes per task, so the CPU work stays off the API
+workers: as base64 PNG, as SVG (no PIL needed), or not at all ("uri"),
+leaving the otpauth:// URI in the bundle for the client to render.
+
+The same runs offline from a CSV of usernames (optional password column):
+
+    python -m app.services.provisioning users.csv --team ops --qr svg > bundle.ndjson
+"""
+import base64
+import io
+import multiprocessing
+import os
+import secrets
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+import pyotp
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..core.security import encrypt_username_with_password
+from ..models import User
+
+PROVISION_WORKERS = int(os.getenv("PROVISION_WORKERS", "2"))
+PROVISION_MAX_USERS = int(os.getenv("PROVISION_MAX_USERS", "1000"))
+QR_CHUNK_SIZE = 16
+
+ISSUER = "TeamTracker"
+QR_FORMATS = ("png", "svg", "uri")
+
+
+class UsernameTakenError(ValueError):
+    """Raised when usernames of a batch are already registered."""
+
+    def __init__(self, usernames: list[str]):
+        super().__init__(f"Username already registered: {', '.join(usernames)}")
+        self.usernames = usernames
+
+
+def otp_uri(username: str, secret: str) -> str:
+    return pyotp.totp.TOTP(secret).provisioning_uri(name=username, issuer_name=ISSUER)
+
+
+def render_qr(uri: str, format: str = "png") -> Optional[str]:
+    """QR code of `uri` as base64 PNG or SVG text; None for "uri"."""
+    if format == "uri":
+        return None
+    # qrcode pulls in PIL; load it on first use rather than at startup
+    import qrcode
+
+    if format == "svg":
+        from qrcode.image.svg import SvgPathImage
+
+        return qrcode.make(uri, image_factory=SvgPathImage).to_string(encoding="unicode")
+    buffer = io.BytesIO()
+    qrcode.make(uri).save(buffer, format="PNG")
+    return base64.b64encode(buffer.getvalue()).decode()
+
+
+def render_entries(entries: list[dict], format: str) -> list[dict]:
+    """Enrollment entries with their "qr" filled in."""
+    return [{**entry, "qr": render_qr(entry["otp_uri"], format)} for entry in entries]
+
+
+def create_users(db: Session, users: list[dict], team: str) -> list[dict]:
+    """
+    Insert `users` ({"username", "password"?}) into `team` and commit.
+    Returns one enrollment entry per user, in order, without the QR code;
+    generated passwords are included, supplied ones are not.
+
+    Raises:
+        UsernameTakenError: If any username exists already
+        ValueError: If the batch is too large or repeats a username
+    """
+    if len(users) > PROVISION_MAX_USERS:
+        raise ValueError(f"At most {PROVISION_MAX_USERS} users per batch")
+    usernames = [user["username"] for user in users]
+    repeated = sorted({name for name in usernames if usernames.count(name) > 1})
+    if repeated:
+        raise ValueError(f"Username repeated in batch: {', '.join(repeated)}")
+
+    def taken() -> list[str]:
+        return sorted(db.scalars(select(User.username).where(User.username.in_(usernames))))
+
+    if taken():
+        raise UsernameTakenError(taken())
+
+    entries, rows = [], []
+    for user in users:
+        password = user.get("password")
+        entry = {"username": user["username"], "team": team, "secret": pyotp.random_base32()}
+        if not password:
+            password = entry["password"] = secrets.token_urlsafe(12)
+        entry["otp_uri"] = otp_uri(entry["username"], entry["secret"])
+        entries.append(entry)
+        rows.append({
+            "username": entry["username"],
+            # Password itself is never stored, see core.security
+            "password": encrypt_username_with_password(entry["username"], password),
+            "otp_secret": entry["secret"],
+            "team": team,
+        })
+    try:
+        ids = db.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), rows).all()
+        db.commit()
+    except IntegrityError:
+        # Registered concurrently since the check
+        db.rollback()
+        raise UsernameTakenError(taken())
+    for entry, user_id in zip(entries, ids):
+        entry["id"] = user_id
+    return entries
+
+
+class QrRenderer:
+    """Process pool rendering enrollment QR codes in chunks."""
+
+    def __init__(self, workers: int, chunk_size: int):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, entries: list[dict], format: str) -> list[Future]:
+        """
+        One future per chunk of create_users() entries, in order, each
+        resolving to the chunk's entries with their QR codes.
+        """
+        chunks = [entries[i:i + self.chunk_size] for i in range(0, len(entries), self.chunk_size)]
+        if format == "uri":
+            # Nothing to render; don't start the pool
+            return [_done(render_entries(chunk, format)) for chunk in chunks]
+        try:
+            return [self._pool().submit(render_entries, chunk, format) for chunk in chunks]
+        except BrokenProcessPool:
+            # A worker died; start a fresh pool once
+            self._discard()
+            return [self._pool().submit(render_entries, chunk, format) for chunk in chunks]
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: the API process runs threads
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def _discard(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _done(result) -> Future:
+    future = Future()
+    future.set_result(result)
+    return future
+
+
+qr_renderer = QrRenderer(PROVISION_WORKERS, QR_CHUNK_SIZE)
+
+
+if __name__ == "__main__":
+    import argparse
+    import csv
+    import sys
+    import orjson
+    from ..database import DEFAULT_TEAM, SessionLocal
+    from ..migrate import bootstrap
+    from ..tenancy import TEAM_PATTERN
+
+    parser = argparse.ArgumentParser(description="Create users from a CSV and write their enrollment bundle as NDJSON.")
+    parser.add_argument("csv", help="CSV with a username column and an optional password column")
+    parser.add_argument("--team", default=DEFAULT_TEAM)
+    parser.add_argument("--qr", choices=QR_FORMATS, default="png")
+    parser.add_argument("--output", "-o", help="bundle file (default: stdout)")
+    args = parser.parse_args()
+    if not TEAM_PATTERN.fullmatch(args.team):
+        sys.exit(f"Invalid team name: {args.team!r}")
+
+    with open(args.csv, newline="", encoding="utf-8") as f:
+        users = [row for row in csv.DictReader(f) if row.get("username")]
+    bootstrap(log=lambda message: print(message, file=sys.stderr))
+    session = SessionLocal()
+    try:
+        entries = create_users(session, users, args.team)
+    except ValueError as e:
+        sys.exit(str(e))
+    finally:
+        session.close()
+
+    out = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in qr_renderer.submit(entries, args.qr):
+            out.write(b"".join(orjson.dumps(entry) + b"\n" for entry in chunk.result()))
+    finally:
+        qr_renderer.shutdown()
+        if args.output:
+            out.close()
+    print(f"Provisioned {len(entries)} users in team {args.team}", file=sys.stderr)
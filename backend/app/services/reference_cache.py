@@ -0,0 +1,92 @@
+"""
+In-process cache for the people and types listings.
+
+Each listing has a version that every write bumps (write-through
+invalidation). The version doubles as the ETag, so a client holding the
+current ETag gets a 304 without a database query or any serialization.
+Cached pages are stored already serialized as JSON bytes, encoded with
+orjson straight from column rows.
+
+Versions are per process: with several workers, REFERENCE_CACHE_TTL bounds
+how long a worker can serve a listing changed through another worker.
+"""
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+from fastapi import Request, Response
+from ..core.responses import dump_rows
+
+# Seconds before a version is retired even without a local write (0 = never)
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "60"))
+
+# Distinguishes ETags issued by different processes
+_BOOT_ID = secrets.token_hex(4)
+
+
+class ListCache:
+    """Versioned cache of serialized list responses, keyed by team and query params."""
+
+    def __init__(self, name: str, ttl: float = REFERENCE_CACHE_TTL):
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = 0
+        self._version_started = time.monotonic()
+        self._pages: dict[tuple, bytes] = {}
+
+    def _expire(self) -> None:
+        """Retire the current version once it is older than the TTL (lock held)."""
+        if self.ttl and time.monotonic() - self._version_started >= self.ttl:
+            self._bump()
+
+    def _bump(self) -> None:
+        self._version += 1
+        self._version_started = time.monotonic()
+        self._pages.clear()
+
+    def _etag(self, team: str, version: int) -> str:
+        return f'"{self.name}-{team}-{_BOOT_ID}-{version}"'
+
+    @property
+    def version(self) -> int:
+        """Version to pass to store(); read it before loading rows."""
+        with self._lock:
+            self._expire()
+            return self._version
+
+    def invalidate(self) -> None:
+        """Drop every cached page; call after any committed write."""
+        with self._lock:
+            self._bump()
+
+    def cached_response(self, request: Request, team: str, key: tuple) -> Optional[Response]:
+        """
+        304 if the client already holds the current version of the team's
+        listing, the cached page if there is one, otherwise None (the caller
+        loads and calls store()).
+        """
+        with self._lock:
+            self._expire()
+            etag = self._etag(team, self._version)
+            if etag in request.headers.get("if-none-match", ""):
+                return Response(status_code=304, headers={"ETag": etag})
+            body = self._pages.get((team, *key))
+        if body is None:
+            return None
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+    def store(self, team: str, key: tuple, rows, version: int) -> Response:
+        """Serialize freshly loaded column rows, cache them and build the response."""
+        body = dump_rows(rows)
+        with self._lock:
+            # A write may have landed while we were loading; don't cache stale rows
+            if version == self._version:
+                self._pages[(team, *key)] = body
+        etag = self._etag(team, version)
+        return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+
+people_cache = ListCache("people")
+types_cache = ListCache("types")
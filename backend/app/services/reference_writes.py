@@ -0,0 +1,130 @@
+"""
+Set-based bulk writes for people and types.
+
+Deletes, renames and merges run as a handful of UPDATE/DELETE statements in
+the caller's transaction, whatever the number of ids, and say explicitly
+what happens to the absences that point at the rows being removed:
+
+    restrict  refuse if any absence references them
+    delete    delete those absences too
+    reassign  move them to another person/type (a merge)
+
+Absences are never left pointing at a missing row, which the absence
+schemas can't represent.
+
+Archived absences are handled the same way. Rollups and daily coverage are
+recomputed in SQL for just the affected people, types and dates.
+"""
+from typing import Literal
+from sqlalchemy import case, delete, func, select, update
+from sqlalchemy.orm import Session
+from ..models import Absence, ArchivedAbsence, People, Type
+from . import changes, coverage, rollups
+from .archive import all_absences
+
+AbsencePolicy = Literal["restrict", "delete", "reassign"]
+
+# Absence column referencing each model
+REFERENCES = {People: Absence.person_id, Type: Absence.type_id}
+
+
+class ReferenceNotFoundError(LookupError):
+    """Raised when some of the requested ids don't exist."""
+
+    def __init__(self, missing: list[int]):
+        super().__init__(f"Not found: {', '.join(map(str, missing))}")
+        self.missing = missing
+
+
+class ReferenceInUseError(ValueError):
+    """Raised by the restrict policy when absences still reference the rows."""
+
+    def __init__(self, absences: int):
+        super().__init__(f"{absences} absences still reference these rows")
+        self.absences = absences
+
+
+def _require(db: Session, model, ids: set[int]) -> None:
+    found = set(db.scalars(select(model.id).where(model.id.in_(ids))))
+    missing = sorted(ids - found)
+    if missing:
+        raise ReferenceNotFoundError(missing)
+
+
+def delete_many(
+    db: Session,
+    model,
+    ids: list[int],
+    absences: AbsencePolicy,
+    reassign_to: int = None,
+) -> dict:
+    """
+    Delete people or types by id, handling their absences per `absences`.
+    Does not commit. Returns the number of rows deleted and of absences
+    deleted or moved.
+    """
+    ids = set(ids)
+    if absences == "reassign":
+        if reassign_to is None:
+            raise ValueError("reassign_to is required to reassign absences")
+        if reassign_to in ids:
+            raise ValueError("reassign_to can't be one of the deleted ids")
+        _require(db, model, ids | {reassign_to})
+    else:
+        _require(db, model, ids)
+
+    column = REFERENCES[model]
+    source = all_absences()
+    referencing = getattr(source, column.key).in_(ids)
+    count = db.scalar(select(func.count(source.id)).where(referencing))
+    if count and absences == "restrict":
+        raise ReferenceInUseError(count)
+
+    # Coverage depends on who is off and for how long, not on the type
+    dates = None
+    if count and (model is People or absences == "delete"):
+        dates = list(db.scalars(select(source.date).where(referencing).distinct()))
+
+    if count:
+        for table in (Absence, ArchivedAbsence):
+            referencing = getattr(table, column.key).in_(ids)
+            if absences == "delete":
+                moved = db.scalars(delete(table).where(referencing).returning(table.id)).all()
+                changes.record(db, "absences", moved, "delete")
+            else:
+                moved = db.scalars(
+                    update(table).where(referencing).values({column.key: reassign_to}).returning(table.id)
+                ).all()
+                changes.record(db, "absences", moved)
+    deleted = db.execute(delete(model).where(model.id.in_(ids))).rowcount
+    changes.record(db, changes.TRACKED[model], sorted(ids), "delete")
+
+    if count:
+        touched = list(ids | ({reassign_to} if absences == "reassign" else set()))
+        if model is People:
+            rollups.refresh_rollups(db, person_ids=touched)
+        else:
+            rollups.refresh_rollups(db, type_ids=touched)
+        if dates:
+            coverage.refresh_coverage(db, dates)
+    return {"affected": deleted, "absences": count}
+
+
+def merge(db: Session, model, source_ids: list[int], target_id: int) -> dict:
+    """Fold several people or types into one: reassign, then delete the rest."""
+    return delete_many(db, model, source_ids, "reassign", reassign_to=target_id)
+
+
+def rename_many(db: Session, model, names: dict[int, str]) -> dict:
+    """
+    Rename many rows with a single UPDATE ... SET name = CASE id ... END.
+    Does not commit.
+    """
+    _require(db, model, set(names))
+    result = db.execute(
+        update(model)
+        .where(model.id.in_(names))
+        .values(name=case(names, value=model.id))
+    )
+    changes.record(db, changes.TRACKED[model], sorted(names))
+    return {"affected": result.rowcount, "absences": 0}
@@ -0,0 +1,182 @@
+"""
+Background report jobs with an on-disk result cache.
+
+Submitting a report returns a job id at once; the report is built by a pool
+of REPORT_WORKERS threads, off the event loop and the request workers. The
+id is a hash of the report parameters and the data version (the team's
+latest change, by cursor and time, and the holidays), and names the result file in the
+team's directory under REPORT_CACHE_DIR.
+A report whose data hasn't changed is therefore served from disk without
+being rebuilt, by whichever worker gets the request, while any write makes
+the next request build a fresh one. The directory is trimmed to
+REPORT_CACHE_MAX_MB, least recently used first.
+"""
+import hashlib
+import importlib.util
+import json
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..models import Change
+from ..tenancy import current_team, team_session
+from .reports import FORMATS, write_report, yearly_rows
+from .workdays import holiday_dates
+
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", "./report_cache")
+REPORT_CACHE_MAX_MB = float(os.getenv("REPORT_CACHE_MAX_MB", "256"))
+
+logger = logging.getLogger("app.report_jobs")
+
+
+def data_version(db: Session) -> str:
+    """
+    Changes whenever absences, people, types or holidays do. The time of the
+    latest change tells a reset or replaced database apart from the one the
+    cursor was seen on before.
+    """
+    latest = db.execute(select(Change.id, Change.changed_at).order_by(Change.id.desc()).limit(1)).first()
+    cursor, changed_at = latest or (0, None)
+    holidays = hashlib.sha256(",".join(day.isoformat() for day in holiday_dates()).encode()).hexdigest()[:16]
+    return f"{cursor}:{changed_at.isoformat() if changed_at else ''}:{holidays}"
+
+
+def report_key(params: dict, version: str) -> str:
+    payload = json.dumps({"params": params, "version": version}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+class ReportCache:
+    """Finished reports as files named by key, evicted by total size."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path(self, team: str, key: str, format: str) -> str:
+        return os.path.join(self.directory, team, f"{key}.{format}")
+
+    def find(self, team: str, key: str) -> Optional[tuple[str, str]]:
+        """(path, format) of a team's cached report, marking it recently used."""
+        for format in FORMATS:
+            path = self.path(team, key, format)
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                continue
+            return path, format
+        return None
+
+    def store(self, team: str, key: str, format: str, write) -> str:
+        """Have `write(path)` produce the report, then publish it atomically."""
+        path = self.path(team, key, format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            write(partial)
+            os.replace(partial, path)
+        finally:
+            if os.path.exists(partial):
+                os.remove(partial)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: str = None) -> None:
+        """
+        Delete least recently used reports until the directory fits
+        max_bytes, sparing `keep` (the report just written).
+        """
+        with self._lock:
+            files = []
+            for root, _, names in os.walk(self.directory):
+                for name in names:
+                    if not name.endswith(".tmp"):
+                        path = os.path.join(root, name)
+                        stat = os.stat(path)
+                        files.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in files)
+            for _, size, path in sorted(files):
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
+
+
+class ReportJobs:
+    """Thread pool building reports into a ReportCache."""
+
+    def __init__(self, cache: ReportCache, workers: int):
+        self.cache = cache
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._executor = None
+        # Queued, running and failed jobs by (team, id); finished ones live on disk
+        self._jobs: dict[tuple[str, str], dict] = {}
+
+    def submit(self, db: Session, params: dict) -> dict:
+        """
+        Start building a report unless the same one is cached or underway.
+        Returns the job's status.
+        """
+        if params["format"] == "xlsx" and importlib.util.find_spec("openpyxl") is None:
+            raise ValueError("XLSX reports need openpyxl installed")
+        team = current_team(db)
+        key = report_key(params, data_version(db))
+        if self.cache.find(team, key) is not None:
+            return {"id": key, "status": "done", "format": params["format"]}
+        with self._lock:
+            job = self._jobs.get((team, key))
+            if job is None or job["status"] == "failed":
+                job = self._jobs[(team, key)] = {"id": key, "status": "queued", "format": params["format"]}
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="report")
+                self._executor.submit(self._run, team, key, params)
+            return dict(job)
+
+    def status(self, team: str, key: str) -> Optional[dict]:
+        with self._lock:
+            job = self._jobs.get((team, key))
+            if job is not None:
+                return dict(job)
+        found = self.cache.find(team, key)
+        if found is not None:
+            return {"id": key, "status": "done", "format": found[1]}
+        return None
+
+    def shutdown(self) -> None:
+        """Stop the pool, dropping jobs that haven't started."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def _run(self, team: str, key: str, params: dict) -> None:
+        with self._lock:
+            self._jobs[(team, key)]["status"] = "running"
+        try:
+            db = team_session(team, read=True)
+            try:
+                rows = yearly_rows(db, params["year"], params.get("person_id"), params.get("type_id"))
+            finally:
+                db.close()
+            self.cache.store(team, key, params["format"], lambda path: write_report(path, params["format"], rows))
+        except Exception as e:
+            logger.exception("Report %s failed", key)
+            with self._lock:
+                self._jobs[(team, key)].update(status="failed", error=str(e))
+            return
+        with self._lock:
+            self._jobs.pop((team, key), None)
+
+
+report_jobs = ReportJobs(ReportCache(REPORT_CACHE_DIR, int(REPORT_CACHE_MAX_MB * 1024 * 1024)), REPORT_WORKERS)
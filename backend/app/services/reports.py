@@ -0,0 +1,51 @@
+"""
+Yearly leave report: one row per person and absence type with the days
+taken in each month, the year's total and the days that fell on working
+days. Written as CSV or XLSX straight to a file.
+"""
+import csv
+from datetime import date
+from sqlalchemy.orm import Session
+from ..models import People, Type
+from .workdays import summarize_working
+
+FORMATS = {"csv": "text/csv", "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"}
+
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+HEADER = ["person", "type", "absences"] + MONTHS + ["total_days", "working_days"]
+
+
+def yearly_rows(db: Session, year: int, person_id: int = None, type_id: int = None) -> list[list]:
+    """Report rows ordered by person and type name."""
+    people = dict(db.query(People.id, People.name))
+    types = dict(db.query(Type.id, Type.name))
+    rows = {}
+    for bucket in summarize_working(db, date(year, 1, 1), date(year, 12, 31), "month", person_id, type_id):
+        key = (bucket["person_id"], bucket["type_id"])
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = [people.get(key[0], ""), types.get(key[1], ""), 0] + [0.0] * 12 + [0.0, 0.0]
+        row[2] += bucket["absence_count"]
+        row[2 + bucket["month"]] += bucket["total_days"]
+        row[-2] += bucket["total_days"]
+        row[-1] += bucket["working_days"]
+    return sorted(rows.values(), key=lambda row: (row[0], row[1]))
+
+
+def write_report(path: str, format: str, rows: list[list]) -> None:
+    """Write rows under HEADER to `path` as CSV or XLSX."""
+    if format == "xlsx":
+        # Only needed for spreadsheet reports
+        from openpyxl import Workbook
+
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Leave")
+        sheet.append(HEADER)
+        for row in rows:
+            sheet.append(row)
+        workbook.save(path)
+    else:
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(HEADER)
+            writer.writerows(rows)
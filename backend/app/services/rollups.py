@@ -0,0 +1,225 @@
+"""
+Per-person, per-type, per-month absence rollups.
+
+The rollup table is maintained incrementally inside the same transaction as
+the absence write, so summaries never need to scan the absences table.
+Yearly figures are the sum of at most twelve monthly rows.
+"""
+from datetime import date
+from sqlalchemy import extract, func, insert, or_, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from ..models import Absence, AbsenceRollup
+from ..tenancy import current_team
+from .archive import absence_source, all_absences
+
+
+def apply_absence(db: Session, absence: Absence, sign: int = 1) -> None:
+    """
+    Add (sign=1) or remove (sign=-1) an absence from its monthly rollup.
+    Does not commit; the caller's transaction covers both writes.
+    """
+    apply_delta(
+        db,
+        absence.person_id,
+        absence.type_id,
+        absence.date.year,
+        absence.date.month,
+        sign,
+        sign * absence.duration_days,
+    )
+
+
+def upsert_increment(db: Session, model, keys: dict, increments: dict) -> None:
+    """
+    Add `increments` to the counter columns of the row identified by `keys`,
+    inserting it if missing. Uses a single INSERT ... ON CONFLICT on SQLite
+    and Postgres; other backends fall back to a locked read-modify-write.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = insert(model).values(**keys, **increments)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                column: getattr(model, column) + getattr(stmt.excluded, column)
+                for column in increments
+            },
+        )
+        db.execute(stmt)
+        return
+
+    row = db.query(model).filter_by(**keys).with_for_update().first()
+    if row is None:
+        db.add(model(**keys, **increments))
+    else:
+        for column, delta in increments.items():
+            setattr(row, column, getattr(model, column) + delta)
+
+
+def apply_delta(
+    db: Session,
+    person_id: int,
+    type_id: int,
+    year: int,
+    month: int,
+    count: int,
+    days: float,
+) -> None:
+    """Upsert a count/day delta into a single rollup bucket of the session's team."""
+    upsert_increment(
+        db,
+        AbsenceRollup,
+        {"team": current_team(db), "person_id": person_id, "type_id": type_id, "year": year, "month": month},
+        {"absence_count": count, "total_days": days},
+    )
+
+
+def refresh_rollups(db: Session, person_ids: list[int] = None, type_ids: list[int] = None) -> None:
+    """
+    Recompute rollups in the database with INSERT ... SELECT ... GROUP BY
+    over duration_days: all of them, or only the buckets of the given
+    people and/or types. Does not commit.
+    """
+    def scope(person_column, type_column):
+        conditions = []
+        if person_ids is not None:
+            conditions.append(person_column.in_(person_ids))
+        if type_ids is not None:
+            conditions.append(type_column.in_(type_ids))
+        return or_(*conditions) if conditions else true()
+
+    # Archived absences keep counting
+    source = all_absences()
+    year = extract("year", source.date)
+    month = extract("month", source.date)
+    grouped = (
+        db.query(
+            source.team,
+            source.person_id,
+            source.type_id,
+            year,
+            month,
+            func.count(source.id),
+            func.coalesce(func.sum(source.duration_days), 0.0),
+        )
+        # Absences orphaned by older deletes have no bucket
+        .filter(source.person_id.isnot(None), source.type_id.isnot(None))
+        .filter(scope(source.person_id, source.type_id))
+        .group_by(source.team, source.person_id, source.type_id, year, month)
+    )
+    db.query(AbsenceRollup).filter(
+        scope(AbsenceRollup.person_id, AbsenceRollup.type_id)
+    ).delete(synchronize_session=False)
+    db.execute(insert(AbsenceRollup).from_select(
+        ["team", "person_id", "type_id", "year", "month", "absence_count", "total_days"],
+        grouped.statement,
+    ))
+
+
+def rebuild_rollups(db: Session) -> int:
+    """
+    Recompute every rollup from the absences table.
+    Used once to backfill databases created before rollups existed.
+    Returns the number of absences folded in.
+    """
+    refresh_rollups(db)
+    total = db.query(func.count(Absence.id)).scalar()
+    db.commit()
+    return total
+
+
+def summarize(
+    db: Session,
+    period: str = "month",
+    year: int = None,
+    person_id: int = None,
+    type_id: int = None,
+):
+    """
+    Read absence totals grouped by person, type and period ("month" or "year").
+    """
+    columns = [AbsenceRollup.person_id, AbsenceRollup.type_id, AbsenceRollup.year]
+    if period == "month":
+        columns.append(AbsenceRollup.month)
+    query = db.query(
+        *columns,
+        func.sum(AbsenceRollup.absence_count).label("absence_count"),
+        func.sum(AbsenceRollup.total_days).label("total_days"),
+    )
+    if year is not None:
+        query = query.filter(AbsenceRollup.year == year)
+    if person_id is not None:
+        query = query.filter(AbsenceRollup.person_id == person_id)
+    if type_id is not None:
+        query = query.filter(AbsenceRollup.type_id == type_id)
+    query = query.group_by(*columns).having(func.sum(AbsenceRollup.absence_count) > 0)
+    return [
+        {
+            "person_id": row.person_id,
+            "type_id": row.type_id,
+            "year": row.year,
+            "month": row.month if period == "month" else None,
+            "absence_count": row.absence_count,
+            "total_days": row.total_days,
+        }
+        for row in query.order_by(*columns).all()
+    ]
+
+
+def summarize_range(
+    db: Session,
+    start: date,
+    end: date,
+    period: str = "month",
+    person_id: int = None,
+    type_id: int = None,
+):
+    """
+    Same totals as summarize() for an arbitrary date range, which rollups
+    can't answer, aggregated in the database from absences.duration_days
+    (and the archive's, when the range reaches it).
+    """
+    source = absence_source(db, start)
+    year = extract("year", source.date)
+    month = extract("month", source.date)
+    columns = [source.person_id, source.type_id, year.label("year")]
+    if period == "month":
+        columns.append(month.label("month"))
+    query = (
+        db.query(
+            *columns,
+            func.count(source.id).label("absence_count"),
+            func.coalesce(func.sum(source.duration_days), 0.0).label("total_days"),
+        )
+        .filter(source.date >= start, source.date <= end)
+    )
+    if person_id is not None:
+        query = query.filter(source.person_id == person_id)
+    if type_id is not None:
+        query = query.filter(source.type_id == type_id)
+    group = [source.person_id, source.type_id, year] + ([month] if period == "month" else [])
+    return [
+        {
+            "person_id": row.person_id,
+            "type_id": row.type_id,
+            "year": int(row.year),
+            "month": int(row.month) if period == "month" else None,
+            "absence_count": row.absence_count,
+            "total_days": row.total_days,
+        }
+        for row in query.group_by(*group).order_by(*group).all()
+    ]
+
+
+if __name__ == "__main__":
+    from ..database import SessionLocal
+    from ..migrate import bootstrap
+
+    bootstrap()
+    session = SessionLocal()
+    try:
+        print(f"Rebuilt rollups from {rebuild_rollups(session)} absences")
+    finally:
+        session.close()
@@ -0,0 +1,102 @@
+"""
+Full-text and prefix search over people names and absence reasons.
+
+SQLite uses FTS5 external-content tables (people_fts, absences_fts) that
+triggers keep in sync with every insert, update and delete, whichever code
+path makes it. PostgreSQL uses GIN indexes over to_tsvector('simple', ...),
+which need no syncing. Other databases fall back to unindexed LIKE.
+
+Every word of the query must match, each as a prefix, so "conf" finds
+"conference" and "ali sm" finds "Alice Smith". Results are ranked by BM25
+(SQLite) or ts_rank (PostgreSQL).
+"""
+import re
+from sqlalchemy import and_, column, func, inspect, literal_column, table
+from sqlalchemy.orm import Session
+from ..models import Absence, People
+
+# (FTS table, source table, indexed column)
+INDEXES = [
+    ("people_fts", "people", "name"),
+    ("absences_fts", "absences", "reason"),
+]
+
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE {fts} USING fts5(
+        {col}, content='{src}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    """CREATE TRIGGER {fts}_ai AFTER INSERT ON {src} BEGIN
+        INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col});
+    END""",
+    """CREATE TRIGGER {fts}_ad AFTER DELETE ON {src} BEGIN
+        INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col});
+    END""",
+    """CREATE TRIGGER {fts}_au AFTER UPDATE OF {col} ON {src} BEGIN
+        INSERT INTO {fts}({fts}, rowid, {col}) VALUES ('delete', old.id, old.{col});
+        INSERT INTO {fts}(rowid, {col}) VALUES (new.id, new.{col});
+    END""",
+    # Index the rows that already exist
+    "INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+]
+
+POSTGRES_DDL = (
+    "CREATE INDEX IF NOT EXISTS ix_{src}_{col}_fts "
+    "ON {src} USING gin (to_tsvector('simple', coalesce({col}, '')))"
+)
+
+
+def install(bind, log=print) -> None:
+    """Create the search index for the bind's dialect if it is missing."""
+    dialect = bind.dialect.name
+    if dialect == "sqlite":
+        existing = set(inspect(bind).get_table_names())
+        for fts, src, col in INDEXES:
+            if fts in existing:
+                continue
+            with bind.begin() as conn:
+                for statement in SQLITE_DDL:
+                    conn.exec_driver_sql(statement.format(fts=fts, src=src, col=col))
+            log(f"Created search index {fts}")
+    elif dialect == "postgresql":
+        with bind.begin() as conn:
+            for _, src, col in INDEXES:
+                conn.exec_driver_sql(POSTGRES_DDL.format(src=src, col=col))
+
+
+def terms(query: str) -> list[str]:
+    """Words of a search query, lower-cased, punctuation dropped."""
+    return re.findall(r"\w+", query.lower())
+
+
+def _search(db: Session, model, fts: str, col: str, words: list[str], skip: int, limit: int) -> list:
+    dialect = db.get_bind().dialect.name
+    query = db.query(model)
+    source = getattr(model, col)
+    if dialect == "sqlite":
+        index = table(fts, column("rowid"), column(fts))
+        match = " ".join(f'"{word}"*' for word in words)
+        query = (
+            query.join(index, index.c.rowid == model.id)
+            .filter(index.c[fts].op("MATCH")(match))
+            .order_by(func.bm25(literal_column(fts)), model.id)
+        )
+    elif dialect == "postgresql":
+        # Must match the indexed expression literally for the GIN index to apply
+        vector = func.to_tsvector(literal_column("'simple'"), func.coalesce(source, literal_column("''")))
+        tsquery = func.to_tsquery(literal_column("'simple'"), " & ".join(f"{word}:*" for word in words))
+        query = query.filter(vector.op("@@")(tsquery)).order_by(func.ts_rank(vector, tsquery).desc(), model.id)
+    else:
+        query = query.filter(and_(*(source.ilike(f"%{word}%") for word in words))).order_by(model.id)
+    return query.offset(skip).limit(limit).all()
+
+
+def search(db: Session, query: str, kind: str = "all", skip: int = 0, limit: int = 20) -> dict:
+    """Ranked people and/or absences matching every word of `query` as a prefix."""
+    words = terms(query)
+    result = {"people": [], "absences": []}
+    if kind in ("all", "people"):
+        result["people"] = _search(db, People, "people_fts", "name", words, skip, limit)
+    if kind in ("all", "absences"):
+        result["absences"] = _search(db, Absence, "absences_fts", "reason", words, skip, limit)
+    return result
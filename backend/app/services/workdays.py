@@ -0,0 +1,211 @@
+"""
+Business-day calendar.
+
+A working day is one of WORKING_WEEKDAYS that isn't in the holidays table.
+The calendar covers whole years and holds, for each date, the number of
+working days before it as one array("l") of prefix sums:
+
+    prefix[i] = working days in [first, first + i days)
+
+so the working days between two dates are two lookups and a subtraction, and
+whether a date is a working day is the difference of neighbouring entries.
+It is cached per worker and rebuilt when holidays change or a range outside
+it is asked for; ranges longer than WORKDAY_MAX_YEARS are refused. Holidays apply to every team and are always read from the
+main database, also when teams keep their rows in files of their own.
+"""
+import os
+import threading
+import time
+from array import array
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from .. import database
+from ..models import Holiday
+from .archive import absence_source
+from .calendar import CALENDAR_CACHE_TTL
+
+# Weekdays worked, Monday = 0
+WORKING_WEEKDAYS = frozenset(
+    int(day) for day in os.getenv("WORKING_WEEKDAYS", "0,1,2,3,4").split(",") if day.strip()
+)
+# Most calendar years one calendar (and so one request) may span
+WORKDAY_MAX_YEARS = int(os.getenv("WORKDAY_MAX_YEARS", "50"))
+
+
+class WorkdayCalendar:
+    """Prefix sums of working days over an inclusive date span."""
+
+    def __init__(self, first: date, last: date, holidays, weekdays=WORKING_WEEKDAYS):
+        self.first = first
+        self.last = last
+        self._origin = first.toordinal()
+        closed = {day.toordinal() for day in holidays}
+        days = (last - first).days + 1
+        prefix = array("l", [0]) * (days + 1)
+        weekday = first.weekday()
+        count = 0
+        for i in range(days):
+            if (weekday + i) % 7 in weekdays and self._origin + i not in closed:
+                count += 1
+            prefix[i + 1] = count
+        self.prefix = prefix
+
+    def covers(self, start: date, end: date) -> bool:
+        return self.first <= start and end <= self.last
+
+    def _index(self, day: date) -> int:
+        if not self.first <= day <= self.last:
+            raise ValueError(f"{day} is outside the calendar ({self.first} to {self.last})")
+        return day.toordinal() - self._origin
+
+    def working_days(self, start: date, end: date) -> int:
+        """Working days from start to end, both included."""
+        if start > end:
+            return 0
+        return self.prefix[self._index(end) + 1] - self.prefix[self._index(start)]
+
+    def is_working(self, day: date) -> bool:
+        i = self._index(day)
+        return self.prefix[i + 1] != self.prefix[i]
+
+
+def holiday_dates(first: date = None, last: date = None) -> list[date]:
+    """Holiday dates, in order, from the main database where /holidays stores them."""
+    query = select(Holiday.date).order_by(Holiday.date)
+    if first is not None:
+        query = query.where(Holiday.date >= first)
+    if last is not None:
+        query = query.where(Holiday.date <= last)
+    db = database.ReadSessionLocal()
+    try:
+        return list(db.scalars(query))
+    finally:
+        db.close()
+
+
+class WorkdayCache:
+    """One calendar per worker, widened on demand and dropped on holiday writes."""
+
+    def __init__(self, ttl: float = CALENDAR_CACHE_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._version = 0
+        self._built = 0.0
+        self._calendar = None
+
+    def invalidate(self) -> None:
+        """Drop the calendar; call after any committed holiday write."""
+        with self._lock:
+            self._version += 1
+            self._calendar = None
+
+    def get(self, start: date, end: date) -> WorkdayCalendar:
+        """
+        A calendar covering start..end, built on a miss.
+
+        Raises:
+            ValueError: If start..end spans more than WORKDAY_MAX_YEARS years
+        """
+        if end.year - start.year >= WORKDAY_MAX_YEARS:
+            raise ValueError(f"Date ranges may span at most {WORKDAY_MAX_YEARS} years")
+        with self._lock:
+            calendar = self._calendar
+            if calendar is not None and self.ttl and time.monotonic() - self._built >= self.ttl:
+                calendar = self._calendar = None
+            if calendar is not None and calendar.covers(start, end):
+                return calendar
+            version = self._version
+
+        # Whole years, widened to last year to next year and to the cached
+        # span, each as far as WORKDAY_MAX_YEARS allows
+        today = date.today()
+        current = (today.year - 1, today.year + 1)
+        first_year, last_year = start.year, end.year
+        for low, high in [current] + ([(calendar.first.year, calendar.last.year)] if calendar else []):
+            if max(last_year, high) - min(first_year, low) < WORKDAY_MAX_YEARS:
+                first_year, last_year = min(first_year, low), max(last_year, high)
+        first, last = date(first_year, 1, 1), date(last_year, 12, 31)
+        calendar = WorkdayCalendar(first, last, holiday_dates(first, last))
+
+        # A far-off range is served but doesn't evict the current years
+        keep = first_year <= current[0] and current[1] <= last_year
+        with self._lock:
+            if keep and version == self._version:
+                self._calendar = calendar
+                self._built = time.monotonic()
+        return calendar
+
+
+workday_cache = WorkdayCache()
+
+
+def absence_bounds(db: Session, person_id: int = None, type_id: int = None):
+    """First and last absence date, archive included, or (None, None) when there are none."""
+    source = absence_source(db)
+    query = select(func.min(source.date), func.max(source.date))
+    if person_id is not None:
+        query = query.where(source.person_id == person_id)
+    if type_id is not None:
+        query = query.where(source.type_id == type_id)
+    return db.execute(query).one()
+
+
+def summarize_working(
+    db: Session,
+    start: date,
+    end: date,
+    period: str = "month",
+    person_id: int = None,
+    type_id: int = None,
+):
+    """
+    summarize_range() totals plus the days off that fell on working days.
+    The database sums days per person, type and date; each date is then
+    weighted by the calendar in one pass.
+
+    Raises:
+        ValueError: If start..end spans more than WORKDAY_MAX_YEARS years
+    """
+    calendar = workday_cache.get(start, end)
+    source = absence_source(db, start)
+    query = (
+        db.query(
+            source.person_id,
+            source.type_id,
+            source.date,
+            func.count(source.id).label("absence_count"),
+            func.coalesce(func.sum(source.duration_days), 0.0).label("total_days"),
+        )
+        .filter(source.date >= start, source.date <= end)
+    )
+    if person_id is not None:
+        query = query.filter(source.person_id == person_id)
+    if type_id is not None:
+        query = query.filter(source.type_id == type_id)
+
+    prefix, origin = calendar.prefix, calendar.first.toordinal()
+    totals = defaultdict(lambda: [0, 0.0, 0.0])
+    for row in query.group_by(source.person_id, source.type_id, source.date):
+        i = row.date.toordinal() - origin
+        key = (row.person_id, row.type_id, row.date.year, row.date.month if period == "month" else None)
+        bucket = totals[key]
+        bucket[0] += row.absence_count
+        bucket[1] += row.total_days
+        if prefix[i + 1] != prefix[i]:
+            bucket[2] += row.total_days
+    return [
+        {
+            "person_id": person,
+            "type_id": absence_type,
+            "year": year,
+            "month": month,
+            "absence_count": count,
+            "total_days": days,
+            "working_days": working,
+        }
+        for (person, absence_type, year, month), (count, days, working) in sorted(
+            totals.items(), key=lambda item: (item[0][0], item[0][1], item[0][2], item[0][3] or 0)
+        )
+    ]
@@ -0,0 +1,127 @@
+"""
+Write-coalescing queue for absence creation.
+
+With ABSENCE_WRITE_BATCH enabled, POST /absences hands its row to a single
+writer thread instead of committing itself. The writer collects requests
+for up to ABSENCE_BATCH_MAX_WAIT_MS or ABSENCE_BATCH_MAX_ROWS, stages them
+with add_absences (one overlap query and one multi-row INSERT, checking each
+row against earlier rows of the batch too) and commits them together: one
+fsync and one write lock for the whole batch instead of one per request.
+Each caller still gets its own row, with its id, or its own error. A batch
+spanning several teams is written as one transaction per team.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from ..tenancy import team_session
+from .absence_writes import AbsenceOverlapError, add_absences
+from .calendar import calendar_cache
+
+# Coalesce concurrent absence creates into shared transactions
+ABSENCE_WRITE_BATCH = os.getenv("ABSENCE_WRITE_BATCH", "false").lower() in ("1", "true", "yes")
+ABSENCE_BATCH_MAX_ROWS = int(os.getenv("ABSENCE_BATCH_MAX_ROWS", "200"))
+ABSENCE_BATCH_MAX_WAIT_MS = float(os.getenv("ABSENCE_BATCH_MAX_WAIT_MS", "5"))
+
+logger = logging.getLogger("app.write_batcher")
+
+
+class WriteBatcher:
+    """Single background writer committing queued absences in batches."""
+
+    def __init__(self, max_rows: int, max_wait_ms: float):
+        self.max_rows = max_rows
+        self.max_wait = max_wait_ms / 1000
+        self._queue: queue.Queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def submit(self, data: dict, overlap: str, team: str) -> Future:
+        """
+        Queue an absence of `team` for the next batch. The future resolves to
+        (stored row, conflicts), or raises AbsenceOverlapError or the
+        error that failed the write.
+        """
+        future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="absence-writer", daemon=True)
+                self._thread.start()
+            self._queue.put((data, overlap, team, future))
+        return future
+
+    def stop(self) -> None:
+        """Flush what is queued and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._queue.put(None)
+        if thread is not None:
+            thread.join()
+
+    def _collect(self) -> tuple[list, bool]:
+        """Block for one request, then gather more until the batch is full or due."""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_rows:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            by_team = defaultdict(list)
+            for item in batch:
+                by_team[item[2]].append(item)
+            for team, items in by_team.items():
+                try:
+                    self._write(team, items)
+                except Exception as e:
+                    # Keep the writer alive and never leave a caller waiting
+                    logger.exception("Absence batch failed")
+                    for *_, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _write(self, team: str, batch: list) -> None:
+        db = team_session(team)
+        try:
+            results = add_absences(db, [data for data, *_ in batch], [overlap for _, overlap, *_ in batch])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            if len(batch) == 1:
+                batch[0][-1].set_exception(e)
+            else:
+                # Isolate the bad request by retrying each in its own transaction
+                for item in batch:
+                    self._write(team, [item])
+            return
+        finally:
+            db.close()
+
+        calendar_cache.invalidate()
+        for (*_, future), (stored, conflicts) in zip(batch, results):
+            if stored is None:
+                future.set_exception(AbsenceOverlapError(conflicts))
+            else:
+                future.set_result((stored, conflicts))
+
+
+absence_batcher = WriteBatcher(ABSENCE_BATCH_MAX_ROWS, ABSENCE_BATCH_MAX_WAIT_MS)
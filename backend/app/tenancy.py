@@ -0,0 +1,198 @@
+"""
+Team (tenant) partitioning.
+
+People, types and absences belong to a team, and a request only sees and
+writes its own team's rows. The team is a claim of the signed-in user's
+token; tokens without one, and rows from before teams existed, are in
+DEFAULT_TEAM.
+
+TENANT_STORAGE chooses how teams are kept apart:
+
+    shared  One database with a team column. A session hook adds
+            `team = :team` for every team-scoped table to each ORM
+            statement of a team session (selects, updates, deletes and
+            INSERT ... SELECT, subqueries included), and new rows are
+            stamped with the team, so no code path can reach another
+            team's rows.
+    files   One SQLite file per team in TENANT_DB_DIR, each with the full
+            schema, so write locks, page caches and indexes are per team.
+            Engines are created, and the file bootstrapped, on first use
+            and kept in an LRU of TENANT_ENGINE_CACHE_SIZE. The team
+            filter still applies but every row in the file matches it.
+
+Users stay in the main database in both modes.
+"""
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Depends, HTTPException, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session, sessionmaker, with_loader_criteria
+from . import database
+from .core.security import get_token_claims
+from .database import DEFAULT_TEAM
+from .models import Absence, AbsenceRollup, ArchivedAbsence, Change, DailyCoverage, People, Type
+
+TENANT_STORAGE = os.getenv("TENANT_STORAGE", "shared")
+TENANT_DB_DIR = os.getenv("TENANT_DB_DIR", "./tenants")
+TENANT_ENGINE_CACHE_SIZE = int(os.getenv("TENANT_ENGINE_CACHE_SIZE", "32"))
+
+# Team names double as file names in files mode
+TEAM_PATTERN = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+# Models with a team column
+TEAM_SCOPED = (People, Type, Absence, ArchivedAbsence, AbsenceRollup, DailyCoverage, Change)
+
+# Execution options lifting the team filter, for bookkeeping shared by all teams
+ALL_TEAMS = {"all_teams": True}
+
+logger = logging.getLogger("app.tenancy")
+
+
+def current_team(db) -> str:
+    """Team of a session; sessions opened outside a request use DEFAULT_TEAM."""
+    return db.info.get("team") or DEFAULT_TEAM
+
+
+def _team_criteria(team: str) -> list:
+    return [
+        with_loader_criteria(model, lambda cls: cls.team == team, include_aliases=True)
+        for model in TEAM_SCOPED
+    ]
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _filter_team(state) -> None:
+    team = state.session.info.get("team")
+    if (
+        team is None
+        or state.is_column_load
+        or state.is_relationship_load
+        or state.execution_options.get("all_teams")
+    ):
+        return
+    state.statement = state.statement.options(*_team_criteria(team))
+
+
+@event.listens_for(Session, "before_flush")
+def _stamp_team(session: Session, flush_context, instances) -> None:
+    team = session.info.get("team")
+    if team is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, TEAM_SCOPED) and obj.team is None:
+            obj.team = team
+
+
+class TenantEngines:
+    """LRU of per-team SQLite engines and their session factories."""
+
+    def __init__(self, directory: str, max_size: int):
+        self.directory = directory
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+
+    def url(self, team: str) -> str:
+        if not TEAM_PATTERN.fullmatch(team):
+            raise ValueError(f"Invalid team name: {team!r}")
+        return f"sqlite:///{os.path.join(self.directory, team)}.db"
+
+    def _entry(self, team: str) -> dict:
+        """Engine entry for a team, bootstrapping its file on first use (lock held)."""
+        entry = self._entries.get(team)
+        if entry is not None:
+            self._entries.move_to_end(team)
+            return entry
+        # migrate imports the services, which import this module
+        from .migrate import bootstrap
+
+        os.makedirs(self.directory, exist_ok=True)
+        engine = database.build_engine(self.url(team), "tenant")
+        bootstrap(bind=engine, log=logger.info)
+        entry = self._entries[team] = {
+            "engine": engine,
+            "session": sessionmaker(autocommit=False, autoflush=False, bind=engine),
+        }
+        while len(self._entries) > self.max_size:
+            _, evicted = self._entries.popitem(last=False)
+            evicted["engine"].dispose()
+        return entry
+
+    def sessionmaker(self, team: str):
+        with self._lock:
+            return self._entry(team)["session"]
+
+    def async_sessionmaker(self, team: str):
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+        with self._lock:
+            entry = self._entry(team)
+            if "async_session" not in entry:
+                engine = database.build_async_engine(database.to_async_url(self.url(team)), "tenant")
+                entry["async_session"] = async_sessionmaker(
+                    engine, class_=AsyncSession, autoflush=False, expire_on_commit=False
+                )
+            return entry["async_session"]
+
+
+tenant_engines = TenantEngines(TENANT_DB_DIR, TENANT_ENGINE_CACHE_SIZE)
+
+
+def team_session(team: str, read: bool = False) -> Session:
+    """A session scoped to one team, on its own file in files mode."""
+    if TENANT_STORAGE == "files":
+        db = tenant_engines.sessionmaker(team)()
+    else:
+        db = (database.ReadSessionLocal if read else database.SessionLocal)()
+    db.info["team"] = team
+    return db
+
+
+def async_team_session(team: str, read: bool = False):
+    """AsyncSession counterpart of team_session."""
+    if TENANT_STORAGE == "files":
+        db = tenant_engines.async_sessionmaker(team)()
+    else:
+        db = (database.AsyncReadSessionLocal if read else database.AsyncSessionLocal)()
+    db.info["team"] = team
+    return db
+
+
+def get_current_team(claims: tuple[str, Optional[str]] = Depends(get_token_claims)) -> str:
+    """FastAPI dependency: the team claim of the bearer token."""
+    team = claims[1] or DEFAULT_TEAM
+    if not TEAM_PATTERN.fullmatch(team):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid team")
+    return team
+
+
+def get_team_db(team: str = Depends(get_current_team)):
+    """Request-scoped session for the caller's team."""
+    db = team_session(team)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_team_read_db(team: str = Depends(get_current_team)):
+    """Like get_team_db, on the read replica when one is configured (shared mode)."""
+    db = team_session(team, read=True)
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_async_team_db(team: str = Depends(get_current_team)):
+    async with async_team_session(team) as db:
+        yield db
+
+
+async def get_async_team_read_db(team: str = Depends(get_current_team)):
+    async with async_team_session(team, read=True) as db:
+        yield db
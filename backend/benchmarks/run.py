@@ -0,0 +1,235 @@
+"""
+In-process load benchmark for the API.
+
+Seeds a synthetic SQLite database, drives app.main:app through an ASGI
+transport with concurrent clients (no network, no uvicorn) and reports
+p50/p95/p99 latency and throughput per endpoint. Memory is the peak RSS of
+the whole process (seeding included) after each endpoint, and how much that
+endpoint raised it. Results are written as JSON so runs can be compared.
+Needs httpx (in requirements.txt).
+
+Run from the backend directory:
+
+    python -m benchmarks.run --people 10000 --types 50 --absences 2000000
+    python -m benchmarks.run --reuse --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "leave-tracker-bench.db"),
+                        help="SQLite file to seed and benchmark against")
+    parser.add_argument("--reuse", action="store_true", help="Benchmark an already seeded --db as is")
+    parser.add_argument("--people", type=int, default=1000)
+    parser.add_argument("--types", type=int, default=20)
+    parser.add_argument("--absences", type=int, default=100000)
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients per endpoint")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per endpoint")
+    parser.add_argument("--endpoints", default="", help="Comma-separated subset of endpoint names")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    return parser.parse_args(argv)
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def process_peak_rss_mb() -> float:
+    """Peak RSS of the whole process so far; it never goes down."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def build_scenarios(dataset: dict) -> dict:
+    """Endpoint name -> function(rng) returning (method, path, json body)."""
+    import pyotp
+    from .seed import BENCH_OTP_SECRET, BENCH_PASSWORD, BENCH_USERNAME
+
+    people, types = dataset["people"], dataset["types"]
+    this_year = date.today().year
+    totp = pyotp.TOTP(BENCH_OTP_SECRET)
+
+    def login(rng):
+        # A fresh code per request, so runs outlasting a 30 s step keep passing
+        return "POST", "/auth/login", {
+            "username": BENCH_USERNAME,
+            "password": BENCH_PASSWORD,
+            "token": totp.now(),
+        }
+
+    return {
+        "auth_login": login,
+        "people_list": lambda rng: ("GET", "/api/people", None),
+        "types_list": lambda rng: ("GET", "/api/types", None),
+        "absences_page": lambda rng: ("GET", "/api/absences?limit=100", None),
+        "absences_person": lambda rng: (
+            "GET", f"/api/absences?person_id={rng.randint(1, people)}&start_date={this_year}-01-01", None,
+        ),
+        "absences_month": lambda rng: (
+            "GET", f"/api/absences?start_date={this_year}-{rng.randint(1, 12):02d}-01&limit=1000", None,
+        ),
+        "absences_summary": lambda rng: ("GET", f"/api/absences/summary?period=year&year={this_year}", None),
+        "absences_calendar": lambda rng: (
+            "GET", f"/api/absences/calendar?month={this_year}-{rng.randint(1, 12):02d}", None,
+        ),
+        "absences_create": lambda rng: ("POST", "/api/absences?overlap=allow", {
+            "date": f"{this_year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "duration": "Full Day",
+            "reason": "benchmark",
+            "type_id": rng.randint(1, types),
+            "person_id": rng.randint(1, people),
+        }),
+    }
+
+
+async def run_endpoint(client, headers: dict, scenario, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors: dict[str, int] = {}
+    remaining = iter(range(requests))
+    rng = random.Random(7)
+    rss_before = process_peak_rss_mb()
+
+    async def worker():
+        for _ in remaining:
+            method, path, body = scenario(rng)
+            started = time.perf_counter()
+            response = await client.request(method, path, json=body, headers=headers)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                status = str(response.status_code)
+                errors[status] = errors.get(status, 0) + 1
+
+    wall_started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall_started
+    latencies.sort()
+    rss_after = process_peak_rss_mb()
+    return {
+        "requests": len(latencies),
+        "errors": sum(errors.values()),
+        "errors_by_status": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "throughput_rps": round(len(latencies) / wall, 1) if wall else 0.0,
+        "process_peak_rss_mb": rss_after,
+        "process_peak_rss_growth_mb": round(rss_after - rss_before, 1),
+    }
+
+
+async def run_all(args, dataset: dict) -> dict:
+    import httpx
+    from app.core.security import create_access_token
+    from app.main import app
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': 'bench-user'})}"}
+    scenarios = build_scenarios(dataset)
+    if args.endpoints:
+        wanted = set(args.endpoints.split(","))
+        scenarios = {name: s for name, s in scenarios.items() if name in wanted}
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for name, scenario in scenarios.items():
+            print(f"  {name} ...", flush=True)
+            results[name] = await run_endpoint(client, headers, scenario, args.requests, args.concurrency)
+    return results
+
+
+def dataset_info(db) -> dict:
+    from app.models import Absence, People, Type
+    return {
+        "people": db.query(People).count(),
+        "types": db.query(Type).count(),
+        "absences": db.query(Absence).count(),
+    }
+
+
+def print_table(results: dict, baseline: dict = None):
+    header = f"{'endpoint':<20}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'errors':>8}{'peak MB':>9}{'+MB':>7}"
+    if baseline:
+        header += f"{'p50 Δ':>9}{'req/s Δ':>9}"
+    print(header)
+    for name, r in results.items():
+        line = (f"{name:<20}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+                f"{r['throughput_rps']:>10.1f}{r['errors']:>8}{r['process_peak_rss_mb']:>9.1f}"
+                f"{r['process_peak_rss_growth_mb']:>7.1f}")
+        before = (baseline or {}).get(name)
+        if before:
+            def delta(key):
+                return f"{(r[key] - before[key]) / before[key] * 100:+.0f}%" if before[key] else "n/a"
+            line += f"{delta('p50_ms'):>9}{delta('throughput_rps'):>9}"
+        print(line)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.reuse:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(args.db + suffix):
+                os.remove(args.db + suffix)
+    # Must be set before the app (and its engine) is imported
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+
+    from app.database import SessionLocal
+    from app.migrate import bootstrap
+
+    bootstrap()
+
+    db = SessionLocal()
+    try:
+        if not args.reuse:
+            from .seed import seed
+            print(f"Seeding {args.db}")
+            started = time.perf_counter()
+            seed(db, args.people, args.types, args.absences)
+            print(f"  done in {time.perf_counter() - started:.1f}s")
+        dataset = dataset_info(db)
+    finally:
+        db.close()
+
+    print(f"Benchmarking {args.requests} requests x {args.concurrency} clients per endpoint")
+    results = asyncio.run(run_all(args, dataset))
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+        },
+        "dataset": dataset,
+        "endpoints": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["endpoints"]
+    print_table(results, baseline)
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
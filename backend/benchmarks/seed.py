@@ -0,0 +1,78 @@
+"""
+Synthetic dataset generator for the benchmark suite.
+
+Creates people, types, a benchmark user and absences spread over recent
+years, inserting in large batches, then rebuilds the derived rollup and
+coverage tables so the database looks like one populated through the API.
+"""
+import random
+from datetime import date, timedelta
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from app.models import Absence, People, Type, User
+from app.core.security import encrypt_username_with_password
+from app.durations import DURATION_DAYS
+from app.services.coverage import rebuild_coverage
+from app.services.rollups import rebuild_rollups
+
+BENCH_USERNAME = "bench-user"
+BENCH_PASSWORD = "Bench@Pass123"
+# Fixed so login requests can compute a valid TOTP code
+BENCH_OTP_SECRET = "JBSWY3DPEHPK3PXP"
+
+DURATIONS = ["Full Day", "First Half", "Second Half"]
+
+
+def seed(
+    db: Session,
+    people: int,
+    types: int,
+    absences: int,
+    years: int = 3,
+    batch_size: int = 10000,
+    rng_seed: int = 42,
+    progress=print,
+) -> dict:
+    """Populate an empty database and return the generated sizes."""
+    rng = random.Random(rng_seed)
+
+    db.add(User(
+        username=BENCH_USERNAME,
+        password=encrypt_username_with_password(BENCH_USERNAME, BENCH_PASSWORD),
+        otp_secret=BENCH_OTP_SECRET,
+    ))
+    db.execute(insert(People), [{"name": f"Person {i:06d}"} for i in range(1, people + 1)])
+    db.execute(insert(Type), [{"name": f"Type {i:03d}"} for i in range(1, types + 1)])
+    db.commit()
+
+    start = date(date.today().year - years + 1, 1, 1)
+    span = (date(date.today().year, 12, 31) - start).days + 1
+    inserted = 0
+    while inserted < absences:
+        size = min(batch_size, absences - inserted)
+        durations = [rng.choice(DURATIONS) for _ in range(size)]
+        db.execute(insert(Absence), [
+            {
+                "date": start + timedelta(days=rng.randrange(span)),
+                "duration": duration,
+                "duration_days": DURATION_DAYS[duration.lower()],
+                "reason": rng.choice(["", "conference", "doctor", "family", "travel"]),
+                "type_id": rng.randint(1, types),
+                "person_id": rng.randint(1, people),
+            }
+            for duration in durations
+        ])
+        db.commit()
+        inserted += size
+        progress(f"  seeded {inserted}/{absences} absences")
+
+    progress("  rebuilding rollups and coverage")
+    rebuild_rollups(db)
+    rebuild_coverage(db)
+    return {
+        "people": people,
+        "types": types,
+        "absences": absences,
+        "first_date": start.isoformat(),
+        "days": span,
+    }
@@ -0,0 +1,30 @@
+import os
+import sys
+import tempfile
+
+# Point the app at throwaway databases before it is imported
+_data_dir = tempfile.mkdtemp(prefix="leave-tracker-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_data_dir}/test.db"
+os.environ["TENANT_DB_DIR"] = os.path.join(_data_dir, "tenants")
+os.environ["REPORT_CACHE_DIR"] = os.path.join(_data_dir, "report_cache")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+from fastapi.testclient import TestClient
+from app.core.security import create_access_token
+from app.main import app
+from app.migrate import bootstrap
+
+bootstrap(log=lambda message: None)
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+def auth_headers(username: str = "tester", team: str = None) -> dict:
+    claims = {"sub": username}
+    if team is not None:
+        claims["team"] = team
+    return {"Authorization": "Bearer " + create_access_token(claims)}
@@ -0,0 +1,22 @@
+from concurrent.futures import ThreadPoolExecutor
+from conftest import auth_headers
+
+
+def test_concurrent_creates_store_one_absence(client):
+    headers = auth_headers(team="racing")
+    person = client.post("/api/people", json={"name": "Racer"}, headers=headers).json()
+    absence_type = client.post("/api/types", json={"name": "Sick"}, headers=headers).json()
+    body = {
+        "date": "2031-06-10", "duration": "Full Day", "reason": "",
+        "type_id": absence_type["id"], "person_id": person["id"],
+    }
+    with ThreadPoolExecutor(8) as pool:
+        codes = list(pool.map(lambda _: client.post("/api/absences", json=body, headers=headers).status_code, range(24)))
+    assert sorted(set(codes)) == [200, 409] and codes.count(200) == 1
+
+    stored = client.get("/api/absences", headers=headers, params={"person_id": person["id"]}).json()
+    assert len(stored) == 1
+    coverage = client.get("/api/absences/coverage", headers=headers, params={
+        "start_date": "2031-06-10", "end_date": "2031-06-10",
+    }).json()
+    assert [day["people_off"] for day in coverage["days"]] == [1]
@@ -0,0 +1,24 @@
+from datetime import date
+from app.services.archive import archive_before
+from app.tenancy import team_session
+from conftest import auth_headers
+
+
+def test_archived_ids_are_not_reused(client):
+    headers = auth_headers(team="reuse")
+    person = client.post("/api/people", json={"name": "Reuser"}, headers=headers).json()
+    absence_type = client.post("/api/types", json={"name": "Leave"}, headers=headers).json()
+
+    def create(day):
+        return client.post("/api/absences", headers=headers, json={
+            "date": day, "duration": "Full Day", "reason": "",
+            "type_id": absence_type["id"], "person_id": person["id"],
+        }).json()["id"]
+
+    archived = create("2014-02-03")
+    db = team_session("reuse")
+    try:
+        assert archive_before(db, date(2015, 1, 1), pause_ms=0) == 1
+    finally:
+        db.close()
+    assert create("2031-02-03") > archived
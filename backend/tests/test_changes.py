@@ -0,0 +1,27 @@
+from datetime import date
+from app.services.archive import archive_before
+from app.tenancy import team_session
+from conftest import auth_headers
+
+
+def test_changes_include_archived_absences(client):
+    headers = auth_headers(team="archiving")
+    person = client.post("/api/people", json={"name": "Old Timer"}, headers=headers).json()
+    absence_type = client.post("/api/types", json={"name": "Leave"}, headers=headers).json()
+    cursor = client.get("/api/changes", headers=headers).json()["cursor"]
+    created = [
+        client.post("/api/absences", headers=headers, json={
+            "date": day, "duration": "Full Day", "reason": "",
+            "type_id": absence_type["id"], "person_id": person["id"],
+        }).json()
+        for day in ("2015-05-05", "2031-05-05")
+    ]
+
+    db = team_session("archiving")
+    try:
+        assert archive_before(db, date(2016, 1, 1), pause_ms=0) == 1
+    finally:
+        db.close()
+
+    changed = client.get("/api/changes", headers=headers, params={"since": cursor}).json()
+    assert [absence["id"] for absence in changed["absences"]] == [absence["id"] for absence in created]
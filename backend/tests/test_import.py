@@ -0,0 +1,27 @@
+from app.services.absence_import import import_absences
+from app.tenancy import team_session
+from conftest import auth_headers
+
+
+def test_import_reports_rows_of_people_deleted_meanwhile(client):
+    headers = auth_headers(team="importing")
+    kept, gone = (
+        client.post("/api/people", json={"name": name}, headers=headers).json()["id"] for name in ("Kept", "Gone")
+    )
+    absence_type = client.post("/api/types", json={"name": "Leave"}, headers=headers).json()["id"]
+
+    def row(person_id, day):
+        return {"date": day, "duration": "Full Day", "reason": "", "type_id": absence_type, "person_id": person_id}
+
+    def rows():
+        yield row(kept, "2031-07-01")
+        assert client.delete(f"/api/people/{gone}", headers=headers).status_code == 200
+        yield row(gone, "2031-07-01")
+        yield row(kept, "2031-07-02")
+
+    db = team_session("importing")
+    try:
+        result = import_absences(db, rows(), chunk_size=2)
+    finally:
+        db.close()
+    assert result == {"imported": 2, "failed": 1, "errors": [{"row": 2, "error": f"Unknown person_id: {gone}"}]}
@@ -0,0 +1,14 @@
+import pytest
+from sqlalchemy.exc import OperationalError
+from app.database import engine
+
+
+def test_metrics_need_a_token_by_default(client):
+    assert client.get("/metrics").status_code == 403
+
+
+def test_failed_statement_is_not_left_timing():
+    with engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.exec_driver_sql("SELECT * FROM no_such_table")
+        assert conn.info.get("query_started") == []
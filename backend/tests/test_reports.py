@@ -0,0 +1,19 @@
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import update
+from app.models import Change
+from app.services.report_jobs import data_version
+from app.tenancy import team_session
+from conftest import auth_headers
+
+
+def test_data_version_tells_a_reset_database_apart(client):
+    client.post("/api/people", json={"name": "Reported"}, headers=auth_headers(team="reporting"))
+    db = team_session("reporting")
+    try:
+        before = data_version(db)
+        # Same cursor, written at another time, as after a reset and new writes
+        db.execute(update(Change).values(changed_at=datetime.now(timezone.utc) + timedelta(hours=1)))
+        db.commit()
+        assert data_version(db) != before
+    finally:
+        db.close()
@@ -0,0 +1,40 @@
+import pyotp
+from app import tenancy
+from conftest import auth_headers
+
+
+def test_register_ignores_requested_team(client):
+    other = auth_headers(team="other")
+    assert client.post("/api/people", json={"name": "Other Person"}, headers=other).status_code == 200
+
+    registered = client.post("/auth/register", json={"username": "intruder", "password": "pw", "team": "other"})
+    assert registered.status_code == 200
+    login = client.post("/auth/login", json={
+        "username": "intruder",
+        "password": "pw",
+        "token": pyotp.TOTP(registered.json()["secret"]).now(),
+    })
+    assert login.status_code == 200
+
+    intruder = {"Authorization": "Bearer " + login.json()["access_token"]}
+    names = [person["name"] for person in client.get("/api/people", headers=intruder).json()]
+    assert "Other Person" not in names
+
+
+def test_files_mode_skips_holidays(client, monkeypatch):
+    monkeypatch.setattr(tenancy, "TENANT_STORAGE", "files")
+    headers = auth_headers(team="filed")
+    assert client.post("/api/holidays", json={"date": "2031-03-04", "name": "Founders Day"}, headers=headers).status_code == 200
+    person = client.post("/api/people", json={"name": "Filed Person"}, headers=headers).json()
+    absence_type = client.post("/api/types", json={"name": "Vacation"}, headers=headers).json()
+    for day in ("2031-03-04", "2031-03-05"):
+        created = client.post("/api/absences", headers=headers, json={
+            "date": day, "duration": "Full Day", "reason": "trip",
+            "type_id": absence_type["id"], "person_id": person["id"],
+        })
+        assert created.status_code == 200
+
+    summary = client.get("/api/absences/summary", headers=headers, params={
+        "start_date": "2031-03-01", "end_date": "2031-03-31", "working_days": "true",
+    }).json()
+    assert [(row["total_days"], row["working_days"]) for row in summary] == [(2.0, 1.0)]
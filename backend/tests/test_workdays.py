@@ -0,0 +1,23 @@
+from datetime import date
+from app.services.workdays import workday_cache
+from conftest import auth_headers
+
+
+def test_long_ranges_are_refused(client):
+    headers = auth_headers()
+    workdays = client.get("/api/workdays", headers=headers, params={
+        "start_date": "0001-01-01", "end_date": "9999-12-31",
+    })
+    assert workdays.status_code == 422
+    summary = client.get("/api/absences/summary", headers=headers, params={
+        "start_date": "1900-01-01", "end_date": "2100-12-31", "working_days": "true",
+    })
+    assert summary.status_code == 422
+
+
+def test_far_off_range_keeps_current_calendar():
+    today = date.today()
+    current = workday_cache.get(today, today)
+    # Monday 7 to Friday 11 January 1901
+    assert workday_cache.get(date(1901, 1, 7), date(1901, 1, 11)).working_days(date(1901, 1, 7), date(1901, 1, 11)) == 5
+    assert workday_cache.get(today, today) is current
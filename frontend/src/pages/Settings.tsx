@@ -20,7 +20,7 @@ import {
 import EditIcon from "@mui/icons-material/Edit";
 import DeleteIcon from "@mui/icons-material/Delete";
 import { peopleApi, typesApi } from "@services/api";
-import type { Person, LeaveType } from "@services/api";
+import type { Person, LeaveType, AbsencePolicy } from "@services/api";
 
 interface TabPanelProps {
   children?: React.ReactNode;
@@ -124,15 +124,20 @@ export default function Settings() {
 
   const handleDelete = async (id: number, type: "person" | "type") => {
     if (!confirm(`Are you sure you want to delete this ${type}?`)) return;
+    const remove = (absences: AbsencePolicy) =>
+      type === "person" ? peopleApi.delete(id, absences) : typesApi.delete(id, absences);
     try {
-      if (type === "person") {
-        await peopleApi.delete(id);
-      } else {
-        await typesApi.delete(id);
+      try {
+        await remove("restrict");
+      } catch (err: any) {
+        // 409: absences still reference it; only delete those when asked to
+        if (err.response?.status !== 409) throw err;
+        if (!confirm(`${err.response.data.detail}. Delete this ${type} and its absences?`)) return;
+        await remove("delete");
       }
       fetchData();
-    } catch (err) {
-      alert(`Failed to delete ${type}`);
+    } catch (err: any) {
+      alert(err.response?.data?.detail || `Failed to delete ${type}`);
     }
   };
 
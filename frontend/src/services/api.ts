@@ -87,6 +87,10 @@ export const authApi = {
   },
 };
 
+// What deleting a person or type does with the absences referencing it;
+// the server refuses with 409 while any remain unless "delete" is given
+export type AbsencePolicy = "restrict" | "delete";
+
 // ============================================
 // People API
 // ============================================
@@ -116,8 +120,8 @@ export const peopleApi = {
     return response.data;
   },
 
-  delete: async (id: number): Promise<{ message: string }> => {
-    const response = await apiClient.delete(`${config.endpoints.people}/${id}`);
+  delete: async (id: number, absences: AbsencePolicy = "restrict"): Promise<{ message: string }> => {
+    const response = await apiClient.delete(`${config.endpoints.people}/${id}`, { params: { absences } });
     return response.data;
   },
 };
@@ -151,8 +155,8 @@ export const typesApi = {
     return response.data;
   },
 
-  delete: async (id: number): Promise<{ message: string }> => {
-    const response = await apiClient.delete(`${config.endpoints.types}/${id}`);
+  delete: async (id: number, absences: AbsencePolicy = "restrict"): Promise<{ message: string }> => {
+    const response = await apiClient.delete(`${config.endpoints.types}/${id}`, { params: { absences } });
     return response.data;
   },
 };